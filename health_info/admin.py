@@ -1,20 +1,179 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+from .bulk import PartialBulkOperation, bulk_delete, bulk_update, delete_import_batch
+from .forms import BulkUpdateForm
 from .models import HealthData
 
+# Верхняя граница кодовых точек Unicode: 'abc' <= x < 'abc' + PREFIX_END
+# выбирает все строки с префиксом 'abc'
+PREFIX_END = '\U0010ffff'
+
+# Ниже этого размера таблицы точный COUNT(*) дёшев и оценка не нужна
+ESTIMATE_THRESHOLD = 100000
+
+
+def prefix_q(field, value):
+    """
+    Поиск по префиксу через диапазон сравнений: в отличие от LIKE,
+    использует обычный B-tree индекс поля в любой СУБД
+    """
+    return Q(**{f'{field}__gte': value, f'{field}__lt': value + PREFIX_END})
+
+
+def estimate_row_count(model):
+    """
+    Оценка числа строк таблицы по статистике СУБД без полного просмотра:
+    pg_class.reltuples в PostgreSQL, sqlite_stat1 в SQLite (после ANALYZE).
+    Возвращает None, если статистики нет.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который для нефильтрованного списка берёт оценку размера
+    таблицы из статистики СУБД вместо COUNT(*) по всем строкам
+    """
+    
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_row_count(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class RangeListFilter(admin.SimpleListFilter):
+    """
+    Фильтр по диапазонам значений вместо отдельного пункта на каждое
+    значение. Диапазоны задаются как (код, подпись, от, до), граница
+    «до» не включается; каждое условие покрывается индексом поля.
+    """
+    field_name = None
+    ranges = []
+    
+    def lookups(self, request, model_admin):
+        return [(code, label) for code, label, _, _ in self.ranges]
+    
+    def queryset(self, request, queryset):
+        for code, _, low, high in self.ranges:
+            if self.value() == code:
+                lookups = {}
+                if low is not None:
+                    lookups[f'{self.field_name}__gte'] = low
+                if high is not None:
+                    lookups[f'{self.field_name}__lt'] = high
+                return queryset.filter(**lookups)
+        return queryset
+
+
+class AgeRangeFilter(RangeListFilter):
+    title = 'возраст'
+    parameter_name = 'age_range'
+    field_name = 'age'
+    ranges = [
+        ('0-17', 'до 18', None, 18),
+        ('18-39', '18–39', 18, 40),
+        ('40-59', '40–59', 40, 60),
+        ('60-74', '60–74', 60, 75),
+        ('75+', '75 и старше', 75, None),
+    ]
+
+
+class SystolicRangeFilter(RangeListFilter):
+    title = 'систолическое давление'
+    parameter_name = 'systolic_range'
+    field_name = 'blood_pressure_systolic'
+    ranges = [
+        ('lt120', 'норма (< 120)', None, 120),
+        ('120-139', 'повышенное (120–139)', 120, 140),
+        ('140-159', 'гипертония 1 ст. (140–159)', 140, 160),
+        ('160+', 'гипертония 2 ст. (≥ 160)', 160, None),
+    ]
+
+
+class HeartRateRangeFilter(RangeListFilter):
+    title = 'пульс'
+    parameter_name = 'heart_rate_range'
+    field_name = 'heart_rate'
+    ranges = [
+        ('lt60', 'брадикардия (< 60)', None, 60),
+        ('60-100', 'норма (60–100)', 60, 101),
+        ('gt100', 'тахикардия (> 100)', 101, None),
+    ]
+
+
+class CholesterolRangeFilter(RangeListFilter):
+    title = 'холестерин'
+    parameter_name = 'cholesterol_range'
+    field_name = 'cholesterol'
+    ranges = [
+        ('lt5.2', 'норма (< 5.2)', None, 5.2),
+        ('5.2-6.2', 'погранично (5.2–6.2)', 5.2, 6.2),
+        ('gt6.2', 'высокий (≥ 6.2)', 6.2, None),
+    ]
+
+
+class BMIRangeFilter(RangeListFilter):
+    title = 'ИМТ'
+    parameter_name = 'bmi_range'
+    field_name = 'bmi_value'
+    ranges = [
+        ('under', 'недостаточный (< 18.5)', None, 18.5),
+        ('normal', 'нормальный (18.5–25)', 18.5, 25),
+        ('over', 'избыточный (25–30)', 25, 30),
+        ('obese', 'ожирение (≥ 30)', 30, None),
+    ]
+
+
 @admin.register(HealthData)
 class HealthDataAdmin(admin.ModelAdmin):
     list_display = [
         'patient_id', 
         'patient_name', 
         'age', 
-        'bmi', 
+        'bmi_display', 
         'blood_pressure_systolic', 
         'blood_pressure_diastolic',
         'created_at'
     ]
-    list_filter = ['created_at', 'age']
+    list_filter = [
+        'created_at',
+        AgeRangeFilter,
+        BMIRangeFilter,
+        SystolicRangeFilter,
+        HeartRateRangeFilter,
+        CholesterolRangeFilter,
+    ]
     search_fields = ['patient_id', 'patient_name']
-    readonly_fields = ['bmi', 'created_at']
+    search_help_text = 'Поиск по началу ID пациента или имени'
+    # Без COUNT(*) по всей таблице в строке «N из M»
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    list_per_page = 50
+    readonly_fields = ['bmi', 'import_batch', 'created_at']
+    actions = ['bulk_delete_selected', 'delete_import_batches', 'bulk_update_selected']
     
     fieldsets = (
         ('Основная информация', {
@@ -32,7 +191,86 @@ class HealthDataAdmin(admin.ModelAdmin):
             )
         }),
         ('Системная информация', {
-            'fields': ('created_at',),
+            'fields': ('import_batch', 'created_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_bmi()
+    
+    @admin.display(description='ИМТ', ordering='bmi_value')
+    def bmi_display(self, obj):
+        return obj.bmi_value
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по префиксу ID пациента или имени через индексы вместо
+        LIKE '%q%'. Имя ищется как введено и с заглавной буквы.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = prefix_q('patient_id', search_term)
+        for variant in {search_term, search_term[:1].upper() + search_term[1:]}:
+            condition |= prefix_q('patient_name', variant)
+        return queryset.filter(condition), False
+    
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление загружает и удаляет записи по одной
+        actions.pop('delete_selected', None)
+        return actions
+    
+    @admin.action(description='Удалить выбранные записи', permissions=['delete'])
+    def bulk_delete_selected(self, request, queryset):
+        try:
+            count = bulk_delete(queryset)
+        except PartialBulkOperation as e:
+            self.message_user(request, str(e), messages.ERROR)
+        else:
+            self.message_user(request, f'Удалено записей: {count}', messages.SUCCESS)
+    
+    @admin.action(description='Удалить пакеты импорта выбранных записей', permissions=['delete'])
+    def delete_import_batches(self, request, queryset):
+        batches = set(queryset.exclude(import_batch='').values_list('import_batch', flat=True).distinct())
+        if not batches:
+            self.message_user(request, 'Выбранные записи не относятся к пакетам импорта', messages.WARNING)
+            return
+        count = 0
+        try:
+            for batch in batches:
+                count += delete_import_batch(batch)
+        except PartialBulkOperation as e:
+            self.message_user(request, f'Удалено записей до ошибки: {count + e.processed}. {e}', messages.ERROR)
+            return
+        self.message_user(
+            request,
+            f'Удалено пакетов импорта: {len(batches)}, записей: {count}',
+            messages.SUCCESS
+        )
+    
+    @admin.action(description='Изменить поле у выбранных записей', permissions=['change'])
+    def bulk_update_selected(self, request, queryset):
+        form = BulkUpdateForm(request.POST if 'apply' in request.POST else None)
+        if form.is_bound and form.is_valid():
+            try:
+                count = bulk_update(queryset, form.cleaned_data['values'])
+            except ValidationError as e:
+                self.message_user(request, ' '.join(e.messages), messages.ERROR)
+            except PartialBulkOperation as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self.message_user(request, f'Изменено записей: {count}', messages.SUCCESS)
+            return None
+        
+        return TemplateResponse(request, 'admin/health_info/healthdata/bulk_update.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Массовое изменение поля',
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
@@ -0,0 +1,155 @@
+"""
+Агрегированные данные для страницы анализа.
+
+Все функции возвращают результат ограниченного размера, не зависящего от
+числа пациентов: сводка — одна строка агрегатов, гистограммы — не более
+MAX_BUCKETS корзин, топ-таблицы — не более MAX_TOP_N строк. Без фильтра
+когорты гистограммы строятся по потоковым гистограммам (sketches) без
+чтения таблицы; с фильтром — одним GROUP BY на показатель.
+"""
+from collections import Counter
+
+from django.db.models import Avg, Count, F, Q, Value
+from django.db.models.functions import Floor, Greatest, Least
+
+from .models import HealthData, MetricSketchBin
+from .sketches import SKETCH_SPECS, get_bin_value
+
+# Ширина корзины гистограммы на странице анализа
+HISTOGRAM_WIDTHS = {
+    'age': 5,
+    'bmi': 1,
+    'blood_pressure_systolic': 10,
+    'blood_pressure_diastolic': 5,
+    'heart_rate': 5,
+    'cholesterol': 0.5,
+}
+MAX_BUCKETS = 200
+
+TOP_METRICS = ['blood_pressure_systolic', 'cholesterol', 'bmi']
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 50
+
+BMI_CATEGORIES = {
+    'underweight': Q(bmi_value__lt=18.5),
+    'normal': Q(bmi_value__gte=18.5, bmi_value__lt=25),
+    'overweight': Q(bmi_value__gte=25, bmi_value__lt=30),
+    'obese': Q(bmi_value__gte=30),
+}
+
+
+def _field(metric):
+    """Поле запроса для показателя: ИМТ вычисляется в БД"""
+    return 'bmi_value' if metric == 'bmi' else metric
+
+
+def get_summary(lookups=None):
+    """
+    Сводная статистика по пациентам (или когорте) одним агрегирующим
+    запросом. Возвращает None, если записей нет.
+    """
+    aggregates = {
+        'total_patients': Count('id'),
+        'avg_age': Avg('age'),
+        'avg_bmi': Avg('bmi_value'),
+        'avg_heart_rate': Avg('heart_rate'),
+        'avg_cholesterol': Avg('cholesterol'),
+    }
+    for category, condition in BMI_CATEGORIES.items():
+        aggregates[category] = Count('id', filter=condition)
+
+    result = HealthData.objects.filter(**(lookups or {})).with_bmi().aggregate(**aggregates)
+    if not result['total_patients']:
+        return None
+
+    summary = {'total_patients': result['total_patients']}
+    for name in ('avg_age', 'avg_bmi', 'avg_heart_rate', 'avg_cholesterol'):
+        summary[name] = round(result[name], 1)
+    summary['bmi_categories'] = {category: result[category] for category in BMI_CATEGORIES}
+    return summary
+
+
+def _bucket_count(metric):
+    spec = SKETCH_SPECS[metric]
+    return min(int(round((spec.upper - spec.lower) / HISTOGRAM_WIDTHS[metric])) + 1, MAX_BUCKETS)
+
+
+def _sketch_histogram(metric):
+    """Корзины гистограммы из потоковой гистограммы показателя"""
+    spec = SKETCH_SPECS[metric]
+    width = HISTOGRAM_WIDTHS[metric]
+    last = _bucket_count(metric) - 1
+    counts = Counter()
+    bins = MetricSketchBin.objects.filter(metric=metric, count__gt=0).values_list('bin', 'count')
+    for index, count in bins:
+        bucket = int((get_bin_value(metric, index) - spec.lower) // width)
+        counts[min(max(bucket, 0), last)] += count
+    return sorted(counts.items())
+
+
+def _query_histogram(metric, lookups):
+    """Корзины гистограммы одним GROUP BY по отфильтрованной выборке"""
+    spec = SKETCH_SPECS[metric]
+    width = HISTOGRAM_WIDTHS[metric]
+    last = _bucket_count(metric) - 1
+    bucket = Floor((F(_field(metric)) - Value(float(spec.lower))) / Value(float(width)))
+    rows = (
+        HealthData.objects.filter(**lookups).with_bmi()
+        .annotate(bucket=Least(Greatest(bucket, Value(0.0)), Value(float(last))))
+        .values('bucket')
+        .annotate(count=Count('id'))
+        .order_by('bucket')
+        .values_list('bucket', 'count')
+    )
+    return [(int(index), count) for index, count in rows]
+
+
+def get_histogram(metric, lookups=None):
+    """
+    Гистограмма показателя: только непустые корзины, не более
+    MAX_BUCKETS. Крайние корзины включают значения вне диапазона.
+    """
+    spec = SKETCH_SPECS[metric]
+    width = HISTOGRAM_WIDTHS[metric]
+    buckets = _query_histogram(metric, lookups) if lookups else _sketch_histogram(metric)
+    return {
+        'metric': metric,
+        'label': spec.label,
+        'width': width,
+        'buckets': [
+            {'start': round(spec.lower + index * width, 2), 'count': count}
+            for index, count in buckets[:MAX_BUCKETS]
+        ],
+    }
+
+
+def get_top_patients(metric, lookups=None, limit=DEFAULT_TOP_N):
+    """Пациенты с наибольшими значениями показателя (не более MAX_TOP_N)"""
+    field = _field(metric)
+    rows = (
+        HealthData.objects.filter(**(lookups or {})).with_bmi()
+        .order_by(F(field).desc(), 'id')
+        .values('id', 'patient_id', 'patient_name', field)[:min(limit, MAX_TOP_N)]
+    )
+    return {
+        'metric': metric,
+        'label': SKETCH_SPECS[metric].label,
+        'rows': [
+            {
+                'id': row['id'],
+                'patient_id': row['patient_id'],
+                'patient_name': row['patient_name'],
+                'value': row[field],
+            }
+            for row in rows
+        ],
+    }
+
+
+def get_analysis_series(lookups=None, top=DEFAULT_TOP_N):
+    """Все ряды для графиков и таблиц страницы анализа"""
+    return {
+        'histograms': [get_histogram(metric, lookups) for metric in HISTOGRAM_WIDTHS],
+        'top': [get_top_patients(metric, lookups, top) for metric in TOP_METRICS],
+        'limits': {'max_buckets': MAX_BUCKETS, 'max_top_n': MAX_TOP_N},
+    }
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по created_at: стабильна при вставках и не требует
+    OFFSET, поэтому глубокие страницы не дороже первых
+    """
+    ordering = '-created_at'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,19 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson указан в requirements.txt
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Компактный JSON-рендерер на orjson (зависимость из requirements.txt).
+    Без orjson используется стандартный рендерер DRF.
+    """
+    compact = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
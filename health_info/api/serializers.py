@@ -0,0 +1,58 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+from ..models import HealthData
+from ..schema import check_pressure_order
+
+# Поля модели, необходимые для вычисляемых полей сериализатора
+COMPUTED_FIELD_SOURCES = {
+    'bmi': ('height', 'weight'),
+}
+
+
+class HealthDataSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор медицинских данных с поддержкой частичной выборки полей
+    (?fields=patient_id,age)
+    """
+    bmi = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = HealthData
+        fields = [
+            'id', 'patient_id', 'patient_name', 'age', 'height', 'weight',
+            'blood_pressure_systolic', 'blood_pressure_diastolic',
+            'heart_rate', 'cholesterol', 'bmi', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def validate(self, attrs):
+        systolic = attrs.get('blood_pressure_systolic')
+        diastolic = attrs.get('blood_pressure_diastolic')
+        if self.instance is not None:
+            if systolic is None:
+                systolic = self.instance.blood_pressure_systolic
+            if diastolic is None:
+                diastolic = self.instance.blood_pressure_diastolic
+
+        try:
+            check_pressure_order(systolic, diastolic)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return attrs
+
+
+def get_model_fields(requested_fields):
+    """
+    Колонки модели для .only() по списку запрошенных полей сериализатора
+    """
+    model_fields = {'id'}
+    for name in requested_fields:
+        model_fields.update(COMPUTED_FIELD_SOURCES.get(name, (name,)))
+    return model_fields
@@ -0,0 +1,18 @@
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from .views import ChangeFeedView, HealthDataViewSet, PercentilesView, PopulationTrendView
+
+app_name = 'health_info_api'
+
+router = DefaultRouter()
+router.register('health-data', HealthDataViewSet, basename='health-data')
+
+urlpatterns = [
+    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
+    path('trends/', PopulationTrendView.as_view(), name='trends'),
+    path('percentiles/', PercentilesView.as_view(), name='percentiles'),
+] + router.urls
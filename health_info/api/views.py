@@ -0,0 +1,264 @@
+import uuid
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..bulk import bulk_delete
+from ..caching import deferred_invalidation, invalidate_data_cache
+from ..changes import get_changes
+from ..duplicates import update_blocking_keys
+from ..forms import CohortFilterForm
+from ..observations import get_patient_trend, get_population_trend, record_observations
+from ..sketches import get_current_values, get_loaded_values, get_percentile_table, update_sketches
+from ..models import HealthData, ObservationRollup
+from ..schema import validate_batch
+from .pagination import CreatedAtCursorPagination
+from .serializers import HealthDataSerializer, get_model_fields
+
+# Максимальное количество записей в одной пакетной операции
+MAX_BATCH_SIZE = 5000
+BULK_BATCH_SIZE = 500
+CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 5000
+
+EDITABLE_FIELDS = [
+    'patient_name', 'age', 'height', 'weight',
+    'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'heart_rate', 'cholesterol'
+]
+
+
+def get_trend_params(request):
+    """Параметры запроса динамики: период и границы дат"""
+    period = request.query_params.get('period', ObservationRollup.PERIOD_DAY)
+    if period not in dict(ObservationRollup.PERIOD_CHOICES):
+        raise serializers.ValidationError({'period': 'Допустимые значения: day, month'})
+    bounds = []
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        try:
+            bounds.append(parse_date(value) if value else None)
+        except ValueError:
+            bounds.append(None)
+        if value and bounds[-1] is None:
+            raise serializers.ValidationError({name: 'Ожидается дата в формате ГГГГ-ММ-ДД'})
+    return period, bounds[0], bounds[1]
+
+
+class HealthDataViewSet(viewsets.ModelViewSet):
+    """
+    REST API медицинских данных: CRUD, курсорная пагинация по created_at,
+    частичная выборка полей (?fields=), фильтр когорты по диапазонам
+    (?age_min=&cholesterol_max=...) и пакетные операции (batch/)
+    """
+    serializer_class = HealthDataSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        known = set(HealthDataSerializer.Meta.fields)
+        return [name for name in fields.split(',') if name in known] or None
+
+    def get_queryset(self):
+        queryset = HealthData.objects.all()
+        if self.action in ('list', 'count'):
+            cohort_form = CohortFilterForm(self.request.query_params)
+            if not cohort_form.is_valid():
+                raise serializers.ValidationError(cohort_form.errors)
+            queryset = cohort_form.filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if fields:
+            # created_at нужен курсору пагинации даже если не запрошен
+            queryset = queryset.only(*(get_model_fields(fields) | {'created_at'}))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def count(self, request):
+        """Размер когорты (?age_min=40&age_max=60&blood_pressure_systolic_min=140)"""
+        return Response({'count': self.get_queryset().count()})
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Пакетная операция в одной транзакции:
+        {"create": [...], "upsert": [...], "delete": ["patient_id", ...]}
+        """
+        if not isinstance(request.data, dict):
+            raise serializers.ValidationError('Ожидается объект с полями create, upsert и delete')
+        create_data = request.data.get('create') or []
+        upsert_data = request.data.get('upsert') or []
+        delete_ids = request.data.get('delete') or []
+
+        if not all(isinstance(part, list) for part in (create_data, upsert_data, delete_ids)):
+            raise serializers.ValidationError('Поля create, upsert и delete должны быть списками')
+        if len(create_data) + len(upsert_data) + len(delete_ids) > MAX_BATCH_SIZE:
+            raise serializers.ValidationError(f'Не более {MAX_BATCH_SIZE} записей в одном запросе')
+
+        if not all(isinstance(record, dict) for record in create_data + upsert_data):
+            raise serializers.ValidationError('Записи create и upsert должны быть объектами')
+
+        # Векторная проверка всего пакета по общей схеме; в ответе только
+        # номера ошибочных строк и их сообщения
+        create_result = validate_batch(create_data)
+        upsert_result = validate_batch(upsert_data)
+        errors = {}
+        if not create_result.valid.all():
+            errors['create'] = create_result.errors()
+        if not upsert_result.valid.all():
+            errors['upsert'] = upsert_result.errors()
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Созданные записи помечаются пакетом импорта, чтобы неудачную
+        # загрузку можно было удалить целиком
+        import_batch = uuid.uuid4().hex
+        with deferred_invalidation(), transaction.atomic():
+            deleted = bulk_delete(HealthData.objects.filter(patient_id__in=delete_ids))
+            created = self._create(create_result.cleaned_records(), import_batch)
+            updated, inserted = self._upsert(upsert_result.cleaned_records(), import_batch)
+            invalidate_data_cache()
+
+        return Response({
+            'created': created,
+            'updated': updated,
+            'inserted': inserted,
+            'deleted': deleted,
+            'import_batch': import_batch if created or inserted else None,
+        })
+
+    @action(detail=True, methods=['get'])
+    def trend(self, request, pk=None):
+        """Динамика показателей пациента (?period=day|month&start=&end=)"""
+        patient = self.get_object()
+        period, start, end = get_trend_params(request)
+        return Response({
+            'patient_id': patient.patient_id,
+            'period': period,
+            'points': get_patient_trend(patient.pk, period, start, end),
+        })
+
+    def _check_unique_ids(self, records, key):
+        ids = [record['patient_id'] for record in records]
+        duplicates = [patient_id for patient_id, count in Counter(ids).items() if count > 1]
+        if duplicates:
+            raise serializers.ValidationError({key: f'Повторяющиеся ID пациентов: {", ".join(sorted(duplicates))}'})
+        return ids
+
+    def _create(self, records, import_batch=''):
+        ids = self._check_unique_ids(records, 'create')
+        existing = list(HealthData.objects.filter(patient_id__in=ids).values_list('patient_id', flat=True))
+        if existing:
+            raise serializers.ValidationError({
+                'create': f'Пациенты уже существуют в базе данных: {", ".join(sorted(existing))}'
+            })
+        created = HealthData.objects.bulk_create(
+            [HealthData(import_batch=import_batch, **record) for record in records],
+            batch_size=BULK_BATCH_SIZE
+        )
+        record_observations(created)
+        update_sketches(added=[get_current_values(record) for record in created])
+        update_blocking_keys((record.pk, record.patient_name, record.age) for record in created)
+        return len(created)
+
+    def _upsert(self, records, import_batch=''):
+        ids = self._check_unique_ids(records, 'upsert')
+        existing = HealthData.objects.in_bulk(ids, field_name='patient_id')
+        now = timezone.now()
+
+        to_update = []
+        to_create = []
+        for record in records:
+            instance = existing.get(record['patient_id'])
+            if instance is None:
+                to_create.append(HealthData(import_batch=import_batch, **record))
+                continue
+            for name in EDITABLE_FIELDS:
+                setattr(instance, name, record[name])
+            # bulk_update не вызывает auto_now
+            instance.updated_at = now
+            to_update.append(instance)
+
+        HealthData.objects.bulk_update(to_update, EDITABLE_FIELDS + ['updated_at'], batch_size=BULK_BATCH_SIZE)
+        created = HealthData.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        record_observations(to_update + created)
+        update_sketches(
+            added=[get_current_values(record) for record in to_update + created],
+            removed=[get_loaded_values(record) for record in to_update]
+        )
+        update_blocking_keys((record.pk, record.patient_name, record.age) for record in to_update + created)
+        return len(to_update), len(created)
+
+
+class ChangeFeedView(APIView):
+    """
+    Лента изменений: записи, созданные или изменённые после курсора,
+    и отметки об удалении. Клиент сохраняет next_cursor и передаёт его
+    в следующем запросе (?cursor=...), пока has_more истинно. Изменения
+    и удаления применяются в порядке updated_at / deleted_at.
+    """
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', CHANGES_PAGE_SIZE)), MAX_CHANGES_PAGE_SIZE)
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'Должно быть целым числом'})
+        if limit < 1:
+            raise serializers.ValidationError({'limit': 'Должно быть положительным числом'})
+
+        try:
+            records, tombstones, next_cursor, has_more = get_changes(
+                request.query_params.get('cursor', ''), limit
+            )
+        except ValueError as e:
+            raise serializers.ValidationError({'cursor': str(e)})
+
+        return Response({
+            'upserts': HealthDataSerializer(records, many=True).data,
+            'deletions': [
+                {
+                    'record_id': tombstone.record_id,
+                    'patient_id': tombstone.patient_id,
+                    'deleted_at': tombstone.deleted_at,
+                }
+                for tombstone in tombstones
+            ],
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+        })
+
+
+class PopulationTrendView(APIView):
+    """Динамика показателей по всем пациентам (?period=day|month&start=&end=)"""
+
+    def get(self, request):
+        period, start, end = get_trend_params(request)
+        return Response({
+            'period': period,
+            'points': get_population_trend(period, start, end),
+        })
+
+
+class PercentilesView(APIView):
+    """
+    Перцентили p50/p90/p99 показателей по потоковым гистограммам
+    (погрешности описаны в health_info.sketches)
+    """
+
+    def get(self, request):
+        return Response({
+            row['metric']: dict(zip(('p50', 'p90', 'p99'), row['values']))
+            for row in get_percentile_table()
+        })
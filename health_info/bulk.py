@@ -0,0 +1,213 @@
+"""
+Массовые операции над выборкой записей: удаление и изменение полей.
+
+Каждая порция выборки обрабатывается одним SELECT (снимок id и старых
+значений показателей), одним UPDATE или DELETE по списку id и пакетными
+вставками отметок об удалении и измерений. Порции выбираются по
+возрастанию id (keyset), поэтому изменение отфильтрованных полей не
+сдвигает выборку.
+
+Выборка размером не больше HEALTH_DATA_BULK_TRANSACTION_LIMIT записей
+обрабатывается в одной транзакции: при ошибке не меняется ничего. Большая
+выборка делится на транзакции по этому пределу, чтобы не держать
+блокировку БД долго; если ошибка случилась после фиксации части
+транзакций, выбрасывается PartialBulkOperation с числом обработанных
+записей.
+
+Запросы выполняются в обход сигналов модели, поэтому кеш, гистограммы,
+история измерений с агрегатами и лента изменений обновляются здесь явно.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .caching import deferred_invalidation, invalidate_data_cache
+from .duplicates import update_blocking_keys
+from .models import DuplicateCandidate, HealthData, HealthDataTombstone, PatientBlockingKey
+from .observations import METRICS, record_observations, remove_observations
+from .schema import NUMERIC_RULES, RULES, check_pressure_order
+from .sketches import SOURCE_FIELDS, get_sketch_values, update_sketches
+
+CHUNK_SIZE = 1000
+DEFAULT_TRANSACTION_LIMIT = 50000
+
+# Поля, доступные для массового изменения
+BULK_UPDATE_FIELDS = [rule.name for rule in NUMERIC_RULES]
+
+
+class PartialBulkOperation(Exception):
+    """Ошибка после фиксации части большой выборки"""
+
+    def __init__(self, processed, error):
+        self.processed = processed
+        self.error = error
+        super().__init__(f'Операция прервана после обработки {processed} записей: {error}')
+
+
+def get_transaction_limit():
+    return getattr(settings, 'HEALTH_DATA_BULK_TRANSACTION_LIMIT', DEFAULT_TRANSACTION_LIMIT)
+
+
+def iter_chunks(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    Порции выборки в виде списков кортежей (id, *fields) по возрастанию id
+    """
+    last_id = 0
+    queryset = queryset.order_by('pk').values_list('pk', *fields)
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def run_in_transactions(chunks, handle_chunk, limit=None):
+    """
+    Обработать порции: все порции до limit записей — в одной транзакции.
+    handle_chunk возвращает число обработанных записей порции.
+    """
+    limit = limit or get_transaction_limit()
+    processed = 0
+    done = False
+    while not done:
+        in_transaction = 0
+        try:
+            with transaction.atomic():
+                for chunk in chunks:
+                    in_transaction += handle_chunk(chunk)
+                    if in_transaction >= limit:
+                        break
+                else:
+                    done = True
+        except Exception as e:
+            if processed:
+                raise PartialBulkOperation(processed, e) from e
+            raise
+        processed += in_transaction
+    return processed
+
+
+def _delete_chunk(chunk):
+    ids = [row[0] for row in chunk]
+    # Зависимые таблицы очищаются явно: DELETE по списку id не выполняет
+    # каскадное удаление Django. История измерений удаляется с пересчётом
+    # затронутых агрегатов популяции
+    remove_observations(ids)
+    PatientBlockingKey.objects.filter(record_id__in=ids).delete()
+    DuplicateCandidate.objects.filter(record_id__in=ids).delete()
+    DuplicateCandidate.objects.filter(duplicate_id__in=ids).delete()
+    # QuerySet.delete() загрузил бы каждую запись в память ради сигналов
+    # pre_delete/post_delete, поэтому записи удаляются одним DELETE, а
+    # действия сигналов — отметки об удалении, гистограммы и сброс кеша —
+    # выполняются здесь пакетно
+    table = connection.ops.quote_name(HealthData._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({", ".join(["%s"] * len(ids))})', ids)
+        deleted = cursor.rowcount
+    HealthDataTombstone.objects.bulk_create([
+        HealthDataTombstone(record_id=row[0], patient_id=row[1]) for row in chunk
+    ])
+    update_sketches(removed=[
+        get_sketch_values(dict(zip(SOURCE_FIELDS, row[2:]))) for row in chunk
+    ])
+    invalidate_data_cache()
+    return deleted
+
+
+def bulk_delete(queryset, chunk_size=CHUNK_SIZE, limit=None):
+    """
+    Удалить все записи выборки. Возвращает количество удалённых записей.
+    """
+    fields = ('patient_id',) + SOURCE_FIELDS
+    with deferred_invalidation():
+        return run_in_transactions(iter_chunks(queryset, fields, chunk_size), _delete_chunk, limit)
+
+
+def clean_update_values(values):
+    """
+    Проверить значения массового изменения по общей схеме.
+    Возвращает словарь с приведёнными значениями.
+    """
+    cleaned = {}
+    for name, value in values.items():
+        if name not in BULK_UPDATE_FIELDS:
+            raise ValidationError(f"Поле {name} нельзя изменять массово")
+        message = RULES[name].check(value)
+        if message:
+            raise ValidationError(message)
+        cleaned[name] = RULES[name].coerce(value)
+    return cleaned
+
+
+def check_update_pressure(queryset, values):
+    """
+    Новое давление должно сохранить порядок систолическое > диастолическое
+    во всех записях выборки; проверяется одним запросом
+    """
+    systolic = values.get('blood_pressure_systolic')
+    diastolic = values.get('blood_pressure_diastolic')
+    if systolic is not None and diastolic is not None:
+        check_pressure_order(systolic, diastolic)
+    elif systolic is not None:
+        if queryset.filter(blood_pressure_diastolic__gte=systolic).exists():
+            raise ValidationError(
+                f"В выборке есть записи с диастолическим давлением не ниже {systolic}"
+            )
+    elif diastolic is not None:
+        if queryset.filter(blood_pressure_systolic__lte=diastolic).exists():
+            raise ValidationError(
+                f"В выборке есть записи с систолическим давлением не выше {diastolic}"
+            )
+
+
+def bulk_update(queryset, values, chunk_size=CHUNK_SIZE, limit=None):
+    """
+    Установить значения полей во всех записях выборки.
+    Возвращает количество изменённых записей.
+    """
+    values = clean_update_values(values)
+    if not values:
+        return 0
+    check_update_pressure(queryset, values)
+
+    metrics_changed = any(name in METRICS for name in values)
+
+    def update_chunk(chunk):
+        ids = [row[0] for row in chunk]
+        updated = HealthData.objects.filter(pk__in=ids).update(updated_at=timezone.now(), **values)
+        old_values = [dict(zip(SOURCE_FIELDS, row[1:])) for row in chunk]
+        update_sketches(
+            added=[get_sketch_values({**old, **values}) for old in old_values],
+            removed=[get_sketch_values(old) for old in old_values]
+        )
+        if metrics_changed:
+            record_observations(
+                HealthData.objects.filter(pk__in=ids).only('pk', 'updated_at', *METRICS)
+            )
+        if 'age' in values:
+            update_blocking_keys(
+                HealthData.objects.filter(pk__in=ids).values_list('pk', 'patient_name', 'age')
+            )
+        invalidate_data_cache()
+        return updated
+
+    with deferred_invalidation():
+        return run_in_transactions(iter_chunks(queryset, SOURCE_FIELDS, chunk_size), update_chunk, limit)
+
+
+def get_import_batches(limit=20):
+    """Последние пакеты импорта с количеством записей"""
+    return list(
+        HealthData.objects.exclude(import_batch='')
+        .values('import_batch')
+        .annotate(count=Count('id'), imported_at=Min('created_at'))
+        .order_by('-imported_at')[:limit]
+    )
+
+
+def delete_import_batch(import_batch, chunk_size=CHUNK_SIZE, limit=None):
+    """Удалить все записи, загруженные одним пакетом импорта"""
+    return bulk_delete(HealthData.objects.filter(import_batch=import_batch), chunk_size, limit)
@@ -0,0 +1,200 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    """
+    Локальный кеш в SQLite-файле, общий для всех воркеров gunicorn.
+
+    Записи хранятся с абсолютным временем истечения (TTL). При превышении
+    MAX_ENTRIES удаляется 1/CULL_FREQUENCY давно не читавшихся записей (LRU).
+
+    Время последнего чтения обновляется не чаще раза в TOUCH_INTERVAL
+    секунд (OPTIONS, по умолчанию 60): иначе каждое попадание в кеш было бы
+    транзакцией записи, и все воркеры выстраивались бы в очередь к файлу.
+    Для вытеснения такой точности достаточно.
+    """
+
+    # Ограничение SQLite на число параметров в одном запросе
+    _batch_size = 500
+    default_touch_interval = 60
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._touch_interval = params.get('OPTIONS', {}).get('TOUCH_INTERVAL', self.default_touch_interval)
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        """Соединение на поток: sqlite3-соединения нельзя делить между потоками"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            self._local.conn = conn
+        return conn
+
+    def _fetch(self, key, now):
+        """(значение, время последнего чтения) или None"""
+        row = self._connection().execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+            return None
+        return value, accessed
+
+    def _touch_accessed(self, keys, now):
+        """Отметка LRU для ключей; при блокировке файла пропускается"""
+        for start in range(0, len(keys), self._batch_size):
+            batch = keys[start:start + self._batch_size]
+            try:
+                self._connection().execute(
+                    f'UPDATE cache SET accessed = ? WHERE key IN ({", ".join("?" * len(batch))})',
+                    (now, *batch)
+                )
+            except sqlite3.OperationalError:
+                return
+
+    def _cull(self, conn):
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            to_delete = count // self._cull_frequency if self._cull_frequency else count
+            conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(to_delete, count - self._max_entries),)
+            )
+
+    def _store(self, mode, key, value, timeout):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if mode == 'add' and self._fetch(key, now) is not None:
+                conn.execute('COMMIT')
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, blob, expires, now)
+            )
+            self._cull(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return True
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._store('add', key, value, timeout)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._store('set', key, value, timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._fetch(key, now)
+        if row is None:
+            return default
+        value, accessed = row
+        if now - accessed >= self._touch_interval:
+            self._touch_accessed([key], now)
+        return pickle.loads(value)
+
+    def get_many(self, keys, version=None):
+        """Выборка пачки ключей запросами IN вместо запроса на каждый ключ"""
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        now = time.time()
+        found = {}
+        stale = []
+        conn = self._connection()
+        made_keys = list(key_map)
+        for start in range(0, len(made_keys), self._batch_size):
+            batch = made_keys[start:start + self._batch_size]
+            placeholders = ', '.join('?' * len(batch))
+            rows = conn.execute(
+                f'SELECT key, value, accessed FROM cache WHERE key IN ({placeholders}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*batch, now)
+            ).fetchall()
+            for key, value, accessed in rows:
+                found[key_map[key]] = pickle.loads(value)
+                if now - accessed >= self._touch_interval:
+                    stale.append(key)
+        if stale:
+            self._touch_accessed(stale, now)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """Запись пачки значений одной транзакцией"""
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self.make_and_validate_key(key, version=version),
+             pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires, now)
+            for key, value in data.items()
+        ]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            self._cull(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), time.time(), key, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._fetch(key, time.time()) is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение переиспользуется между запросами одного потока
+        pass
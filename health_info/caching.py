@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+GENERATION_KEY = 'health_info:generation'
+
+_deferred = threading.local()
+
+
+def get_data_generation():
+    """
+    Текущее поколение данных. Меняется при любой записи в HealthData,
+    поэтому все ключи старого поколения перестают использоваться сразу
+    во всех воркерах.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(GENERATION_KEY, generation, timeout=None):
+            generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def invalidate_data_cache():
+    """
+    Сбросить все закешированные производные данные. Поколение меняется
+    после фиксации текущей транзакции: иначе другой воркер успел бы
+    вычислить значение по ещё не удалённым строкам уже под новым ключом
+    и отдавать его до истечения TIMEOUT. Вне транзакции сброс сразу.
+    """
+    if getattr(_deferred, 'depth', 0):
+        _deferred.pending = True
+        return
+    transaction.on_commit(_rotate_generation)
+
+
+def _rotate_generation():
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+@contextmanager
+def deferred_invalidation():
+    """
+    Объединить сбросы кеша внутри пакетной операции в один сброс при выходе
+    (после фиксации внешней транзакции, если она есть)
+    """
+    _deferred.depth = getattr(_deferred, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _deferred.depth -= 1
+        if not _deferred.depth and getattr(_deferred, 'pending', False):
+            _deferred.pending = False
+            invalidate_data_cache()
+
+
+def make_data_key(name, *parts):
+    """Ключ кеша, привязанный к текущему поколению данных"""
+    digest = hashlib.md5('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'health_info:{get_data_generation()}:{name}:{digest}'
+
+
+def get_or_compute(name, compute, *parts, timeout=None):
+    """
+    Вернуть значение из общего кеша или вычислить и сохранить его.
+    timeout=None означает таймаут по умолчанию из настроек CACHES.
+    """
+    key = make_data_key(name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            cache.set(key, value)
+        else:
+            cache.set(key, value, timeout)
+    return value
+
+
+ROW_TEMPLATE = 'health_info/patient_row.html'
+ROW_TIMEOUT = 60 * 60 * 24
+# Увеличивается при изменении разметки patient_row.html
+ROW_VERSION = 2
+
+
+def make_row_key(record):
+    """Ключ фрагмента строки: меняется при любом изменении записи"""
+    return f'health_info:row:{ROW_VERSION}:{record.id}:{record.updated_at.timestamp()}'
+
+
+def render_patient_rows(records, use_cache=True):
+    """
+    Отрисовать строки таблицы пациентов. Готовые фрагменты берутся из
+    кеша одним запросом, заново рендерятся только изменившиеся записи.
+    """
+    records = list(records)
+    if not use_cache:
+        return [mark_safe(render_to_string(ROW_TEMPLATE, {'record': record})) for record in records]
+    
+    keys = [make_row_key(record) for record in records]
+    cached_rows = cache.get_many(keys)
+    missing = {}
+    rows = []
+    for key, record in zip(keys, records):
+        row = cached_rows.get(key)
+        if row is None:
+            row = render_to_string(ROW_TEMPLATE, {'record': record})
+            missing[key] = row
+        rows.append(mark_safe(row))
+    
+    if missing:
+        cache.set_many(missing, ROW_TIMEOUT)
+    return rows
@@ -0,0 +1,92 @@
+import base64
+import heapq
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import HealthData, HealthDataTombstone
+
+
+def encode_cursor(updated_at=None, record_id=0, tombstone_id=0):
+    """Упаковать позицию в ленте изменений в непрозрачную строку"""
+    payload = {
+        'u': updated_at.isoformat() if updated_at else None,
+        'i': record_id,
+        't': tombstone_id,
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Распаковать курсор: (updated_at, id последней записи, id последней
+    отметки об удалении). Пустой курсор означает начало ленты.
+    """
+    if not cursor:
+        return None, 0, 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        updated_at = parse_datetime(payload['u']) if payload['u'] else None
+        return updated_at, int(payload['i']), int(payload['t'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Некорректный курсор ленты изменений')
+
+
+def get_changed_records(updated_at, record_id):
+    """
+    Записи, созданные или изменённые после позиции курсора, в порядке
+    (updated_at, id); использует индекс по этим полям
+    """
+    records = HealthData.objects.order_by('updated_at', 'id')
+    if updated_at is not None:
+        records = records.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=record_id)
+        )
+    return records
+
+
+def get_tombstones(tombstone_id):
+    """Отметки об удалении после позиции курсора"""
+    return HealthDataTombstone.objects.filter(id__gt=tombstone_id).order_by('id')
+
+
+def get_changes(cursor, limit):
+    """
+    Одна страница ленты изменений: (записи, удаления, следующий курсор,
+    есть ли ещё данные)
+    """
+    updated_at, record_id, tombstone_id = decode_cursor(cursor)
+    records = list(get_changed_records(updated_at, record_id)[:limit + 1])
+    tombstones = list(get_tombstones(tombstone_id)[:limit + 1])
+    has_more = len(records) > limit or len(tombstones) > limit
+    records = records[:limit]
+    tombstones = tombstones[:limit]
+    
+    if records:
+        updated_at, record_id = records[-1].updated_at, records[-1].id
+    if tombstones:
+        tombstone_id = tombstones[-1].id
+    
+    return records, tombstones, encode_cursor(updated_at, record_id, tombstone_id), has_more
+
+
+def iter_changes(cursor, chunk_size=1000):
+    """
+    Все изменения после курсора в хронологическом порядке:
+    пары ('upsert', запись) и ('delete', отметка). Удаления и изменения
+    упорядочены по времени, поэтому удаление и повторное создание
+    одного patient_id применяются в правильной последовательности.
+    """
+    updated_at, record_id, tombstone_id = decode_cursor(cursor)
+    upserts = (
+        (record.updated_at, 'upsert', record)
+        for record in get_changed_records(updated_at, record_id).iterator(chunk_size=chunk_size)
+    )
+    deletes = (
+        (tombstone.deleted_at, 'delete', tombstone)
+        for tombstone in get_tombstones(tombstone_id).iterator(chunk_size=chunk_size)
+    )
+    for _, operation, item in heapq.merge(upserts, deletes, key=lambda change: change[0]):
+        yield operation, item
+
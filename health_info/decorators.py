@@ -0,0 +1,43 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """
+    Аналог django.views.decorators.http.condition для асинхронных
+    представлений. Функции валидаторов обращаются к БД и файловой системе,
+    поэтому выполняются через sync_to_async.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            res_last_modified = None
+            if last_modified_func:
+                dt = await sync_to_async(last_modified_func)(request, *args, **kwargs)
+                if dt:
+                    res_last_modified = int(dt.timestamp())
+
+            res_etag = None
+            if etag_func:
+                res_etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                res_etag = quote_etag(res_etag) if res_etag is not None else None
+
+            response = get_conditional_response(
+                request,
+                etag=res_etag,
+                last_modified=res_last_modified,
+            )
+            if response is None:
+                response = await func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if res_last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(res_last_modified)
+                if res_etag:
+                    response.headers.setdefault('ETag', res_etag)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,222 @@
+"""
+Поиск записей, относящихся к одному пациенту под разными ID.
+
+Попарное сравнение всех записей — O(n²), поэтому используется индекс
+блокировки (PatientBlockingKey): для каждой записи хранятся ключи из
+фонетического кода имени и возрастной полосы, и сравниваются только
+записи с общим ключом. Ключи:
+- полный фонетический код имени (слова отсортированы, поэтому порядок
+  «Фамилия Имя» / «Имя Фамилия» не важен);
+- первые буквы фонетического кода каждого слова — ловит опечатки
+  в окончаниях.
+Каждый ключ строится для двух сдвинутых сеток возрастных полос шириной
+5 лет, поэтому записи с разницей в возрасте до 2 лет всегда попадают
+в общий блок.
+
+Пары внутри блока оцениваются по сходству нормализованных имён, возраста
+и роста; пары с оценкой не ниже порога сохраняются в DuplicateCandidate
+для ручной проверки.
+"""
+import re
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+
+from django.db import transaction
+
+from .models import DuplicateCandidate, HealthData, PatientBlockingKey
+
+DEFAULT_THRESHOLD = 0.8
+AGE_BAND_WIDTH = 5
+PREFIX_LENGTH = 3
+# Блоки больше этого размера (очень распространённые имена) пропускаются:
+# сравнение внутри них снова становится квадратичным
+MAX_BLOCK_SIZE = 500
+BATCH_SIZE = 5000
+
+VOWELS = str.maketrans({
+    'о': 'а', 'ы': 'а', 'я': 'а',
+    'е': 'и', 'э': 'и', 'й': 'и',
+    'ю': 'у',
+})
+VOICED = str.maketrans('бвгджз', 'пфктшс')
+
+
+def normalize_name(name):
+    """Слова имени в нижнем регистре без знаков препинания, по алфавиту"""
+    return sorted(re.findall(r'[^\W\d_]+', name.lower().replace('ё', 'е')))
+
+
+def phonetic_code(word):
+    """
+    Упрощённый фонетический код слова: безударные гласные и парные
+    согласные сводятся к одной букве, мягкий и твёрдый знаки и повторы
+    букв удаляются («Иваноф», «Ивонов» и «Иванов» дают один код)
+    """
+    word = word.replace('ь', '').replace('ъ', '')
+    word = word.translate(VOWELS).translate(VOICED)
+    return re.sub(r'(.)\1+', r'\1', word)
+
+
+def get_blocking_keys(name, age):
+    """Ключи блокировки записи"""
+    codes = sorted(phonetic_code(word) for word in normalize_name(name))
+    if not codes:
+        return []
+    names = {
+        'f:' + ''.join(codes)[:40],
+        'p:' + '.'.join(code[:PREFIX_LENGTH] for code in codes)[:40],
+    }
+    bands = {f'a{age // AGE_BAND_WIDTH}', f'b{(age + 2) // AGE_BAND_WIDTH}'}
+    return sorted(f'{key}|{band}' for key in names for band in bands)
+
+
+def update_blocking_keys(rows):
+    """
+    Перестроить ключи блокировки для записей; rows — кортежи
+    (id, patient_name, age)
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    with transaction.atomic():
+        PatientBlockingKey.objects.filter(record_id__in=[row[0] for row in rows]).delete()
+        PatientBlockingKey.objects.bulk_create(
+            [
+                PatientBlockingKey(record_id=record_id, key=key)
+                for record_id, name, age in rows
+                for key in get_blocking_keys(name, age)
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+
+def rebuild_blocking_index():
+    """Полностью перестроить индекс блокировки по текущим данным"""
+    with transaction.atomic():
+        PatientBlockingKey.objects.all().delete()
+        batch = []
+        records = HealthData.objects.values_list('id', 'patient_name', 'age').iterator(chunk_size=BATCH_SIZE)
+        for record_id, name, age in records:
+            batch.extend(PatientBlockingKey(record_id=record_id, key=key) for key in get_blocking_keys(name, age))
+            if len(batch) >= BATCH_SIZE:
+                PatientBlockingKey.objects.bulk_create(batch)
+                batch = []
+        PatientBlockingKey.objects.bulk_create(batch)
+    return PatientBlockingKey.objects.count()
+
+
+def score_pair(a, b):
+    """
+    Оценка сходства двух записей от 0 до 1: имя (вес 0.7), возраст (0.2),
+    рост (0.1). a и b — словари с полями patient_name, age, height.
+    """
+    name_a = ' '.join(normalize_name(a['patient_name']))
+    name_b = ' '.join(normalize_name(b['patient_name']))
+    name_score = SequenceMatcher(None, name_a, name_b).ratio()
+    age_score = max(0.0, 1 - abs(a['age'] - b['age']) / AGE_BAND_WIDTH)
+    height_score = max(0.0, 1 - abs(a['height'] - b['height']) / 10)
+    return round(0.7 * name_score + 0.2 * age_score + 0.1 * height_score, 3)
+
+
+def iter_candidate_pairs():
+    """
+    Пары id записей с общим ключом блокировки. Ключи читаются по индексу
+    (key, record) в порядке ключа, поэтому в памяти хранится один блок.
+    """
+    keys = PatientBlockingKey.objects.order_by('key', 'record_id').values_list('key', 'record_id')
+    for _, block in groupby(keys.iterator(chunk_size=BATCH_SIZE), key=lambda row: row[0]):
+        ids = [record_id for _, record_id in block]
+        if 1 < len(ids) <= MAX_BLOCK_SIZE:
+            yield from combinations(ids, 2)
+
+
+def _fetch_records(ids):
+    records = {}
+    ids = list(ids)
+    # Порции по 900 id укладываются в лимит параметров SQLite
+    for start in range(0, len(ids), 900):
+        for row in HealthData.objects.filter(pk__in=ids[start:start + 900]).values(
+            'id', 'patient_name', 'age', 'height'
+        ):
+            records[row['id']] = row
+    return records
+
+
+def _save_candidates(scored):
+    """Сохранить новые пары; пары, уже отмеченные как не дубликаты, не меняются"""
+    DuplicateCandidate.objects.bulk_create(
+        [DuplicateCandidate(record_id=a, duplicate_id=b, score=score) for a, b, score in scored],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def find_duplicates(threshold=DEFAULT_THRESHOLD):
+    """
+    Найти пары-кандидаты по всей базе и сохранить их для проверки.
+    Возвращает (число сравнений, число пар на проверке). Пара с
+    несколькими общими ключами может сравниваться повторно, но
+    сохраняется один раз.
+    """
+    compared = 0
+    pairs = set()
+
+    def flush():
+        nonlocal compared
+        records = _fetch_records({record_id for pair in pairs for record_id in pair})
+        scored = []
+        for a, b in pairs:
+            if a in records and b in records:
+                score = score_pair(records[a], records[b])
+                if score >= threshold:
+                    scored.append((a, b, score))
+        _save_candidates(scored)
+        compared += len(pairs)
+        pairs.clear()
+
+    for pair in iter_candidate_pairs():
+        pairs.add(pair)
+        if len(pairs) >= BATCH_SIZE:
+            flush()
+    flush()
+    return compared, get_pending_candidates().count()
+
+
+def find_candidates(record, threshold=DEFAULT_THRESHOLD):
+    """
+    Возможные дубликаты одной записи по индексу блокировки.
+    Возвращает список (запись, оценка) по убыванию оценки.
+    """
+    keys = get_blocking_keys(record.patient_name, record.age)
+    ids = (
+        PatientBlockingKey.objects.filter(key__in=keys)
+        .exclude(record_id=record.pk)
+        .values_list('record_id', flat=True)
+        .distinct()
+    )
+    target = {'patient_name': record.patient_name, 'age': record.age, 'height': record.height}
+    candidates = []
+    for other in HealthData.objects.filter(pk__in=ids):
+        score = score_pair(target, {'patient_name': other.patient_name, 'age': other.age, 'height': other.height})
+        if score >= threshold:
+            candidates.append((other, score))
+    candidates.sort(key=lambda item: item[1], reverse=True)
+    return candidates
+
+
+def register_candidates(record, threshold=DEFAULT_THRESHOLD):
+    """Найти и сохранить возможные дубликаты новой или изменённой записи"""
+    candidates = find_candidates(record, threshold)
+    _save_candidates([
+        (min(record.pk, other.pk), max(record.pk, other.pk), score)
+        for other, score in candidates
+    ])
+    return candidates
+
+
+def get_pending_candidates():
+    return (
+        DuplicateCandidate.objects.filter(status=DuplicateCandidate.STATUS_PENDING)
+        .select_related('record', 'duplicate')
+        .order_by('-score', 'id')
+    )
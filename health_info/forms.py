@@ -1,5 +1,7 @@
 from django import forms
 from .models import HealthData
+from .bulk import BULK_UPDATE_FIELDS, clean_update_values, get_import_batches
+from .schema import RULES
 
 class HealthDataForm(forms.ModelForm):
     class Meta:
@@ -16,59 +18,43 @@ class HealthDataForm(forms.ModelForm):
             }),
             'age': forms.NumberInput(attrs={
                 'class': 'form-control',
-                'min': '0',
-                'max': '150'
+                **RULES['age'].widget_attrs()
             }),
             'height': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.1',
-                'min': '0',
-                'placeholder': 'Рост в сантиметрах'
+                'placeholder': 'Рост в сантиметрах',
+                **RULES['height'].widget_attrs()
             }),
             'weight': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.1',
-                'min': '0',
-                'placeholder': 'Вес в килограммах'
+                'placeholder': 'Вес в килограммах',
+                **RULES['weight'].widget_attrs()
             }),
             'blood_pressure_systolic': forms.NumberInput(attrs={
                 'class': 'form-control',
-                'min': '50',
-                'max': '250',
-                'placeholder': 'Верхнее давление'
+                'placeholder': 'Верхнее давление',
+                **RULES['blood_pressure_systolic'].widget_attrs()
             }),
             'blood_pressure_diastolic': forms.NumberInput(attrs={
                 'class': 'form-control',
-                'min': '30',
-                'max': '150',
-                'placeholder': 'Нижнее давление'
+                'placeholder': 'Нижнее давление',
+                **RULES['blood_pressure_diastolic'].widget_attrs()
             }),
             'heart_rate': forms.NumberInput(attrs={
                 'class': 'form-control',
-                'min': '30',
-                'max': '200',
-                'placeholder': 'Ударов в минуту'
+                'placeholder': 'Ударов в минуту',
+                **RULES['heart_rate'].widget_attrs()
             }),
             'cholesterol': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.1',
-                'min': '0',
-                'placeholder': 'Уровень холестерина'
+                'placeholder': 'Уровень холестерина',
+                **RULES['cholesterol'].widget_attrs()
             }),
         }
     
-    def clean(self):
-        cleaned_data = super().clean()
-        systolic = cleaned_data.get('blood_pressure_systolic')
-        diastolic = cleaned_data.get('blood_pressure_diastolic')
-        
-        if systolic and diastolic and systolic <= diastolic:
-            raise forms.ValidationError(
-                "Систолическое давление должно быть больше диастолического"
-            )
-        
-        return cleaned_data
-
 class FileUploadForm(forms.Form):
     FILE_TYPES = [
         ('json', 'JSON файл'),
@@ -79,7 +65,7 @@ class FileUploadForm(forms.Form):
         label='Выберите файл для загрузки',
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.json,.xml'
+            'accept': '.json,.xml,.gz'
         })
     )
     file_type = forms.ChoiceField(
@@ -113,4 +99,169 @@ class DataSourceForm(forms.Form):
         label='Источник данных',
         widget=forms.RadioSelect(attrs={'class': 'form-check-input'}),
         initial='db'
-    )
\ No newline at end of file
+    )
+
+class CohortFilterForm(forms.Form):
+    """
+    Фильтр когорты по диапазонам показателей, например
+    «возраст 40–60, систолическое ≥ 140, холестерин > 6».
+    Каждое поле превращается в условие WHERE, покрываемое индексами.
+    """
+    RANGE_FIELDS = [
+        ('age', 'Возраст', forms.IntegerField),
+        ('blood_pressure_systolic', 'Систолическое давление', forms.IntegerField),
+        ('blood_pressure_diastolic', 'Диастолическое давление', forms.IntegerField),
+        ('heart_rate', 'Пульс', forms.IntegerField),
+        ('cholesterol', 'Холестерин', forms.FloatField),
+    ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, label, field_class in self.RANGE_FIELDS:
+            for suffix, placeholder in (('min', 'от'), ('max', 'до')):
+                self.fields[f'{name}_{suffix}'] = field_class(
+                    required=False,
+                    label=f'{label} {placeholder}',
+                    widget=forms.NumberInput(attrs={
+                        'class': 'form-control form-control-sm',
+                        'step': 'any',
+                        'placeholder': placeholder
+                    })
+                )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, label, _ in self.RANGE_FIELDS:
+            low = cleaned_data.get(f'{name}_min')
+            high = cleaned_data.get(f'{name}_max')
+            if low is not None and high is not None and low > high:
+                raise forms.ValidationError(
+                    f'{label}: нижняя граница больше верхней'
+                )
+        return cleaned_data
+    
+    def range_rows(self):
+        """Пары полей (от, до) для вывода в шаблоне"""
+        return [
+            (label, self[f'{name}_min'], self[f'{name}_max'])
+            for name, label, _ in self.RANGE_FIELDS
+        ]
+    
+    def get_lookups(self):
+        """Условия фильтрации в виде аргументов для QuerySet.filter()"""
+        if not self.is_valid():
+            return {}
+        lookups = {}
+        for name, _, _ in self.RANGE_FIELDS:
+            low = self.cleaned_data.get(f'{name}_min')
+            high = self.cleaned_data.get(f'{name}_max')
+            if low is not None:
+                lookups[f'{name}__gte'] = low
+            if high is not None:
+                lookups[f'{name}__lte'] = high
+        return lookups
+    
+    def filter_queryset(self, queryset):
+        return queryset.filter(**self.get_lookups())
+    
+    @property
+    def is_active(self):
+        return bool(self.get_lookups())
+
+class BulkUpdateForm(forms.Form):
+    """Новое значение одного поля для массового изменения"""
+    field = forms.ChoiceField(
+        required=False,
+        label='Поле',
+        choices=[(name, RULES[name].label) for name in BULK_UPDATE_FIELDS],
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    value = forms.CharField(
+        required=False,
+        label='Новое значение',
+        widget=forms.TextInput(attrs={
+            'class': 'form-control form-control-sm',
+            'placeholder': 'Новое значение'
+        })
+    )
+    
+    def is_update(self, cleaned_data):
+        return True
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.is_update(cleaned_data):
+            field = cleaned_data.get('field')
+            if not field:
+                raise forms.ValidationError('Выберите поле для изменения')
+            cleaned_data['values'] = clean_update_values({field: cleaned_data.get('value')})
+        return cleaned_data
+
+class RecordIdsField(forms.TypedMultipleChoiceField):
+    """Список id записей; существование проверяется при выборке из БД"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(coerce=int, widget=forms.MultipleHiddenInput, **kwargs)
+    
+    def valid_value(self, value):
+        return True
+
+def get_import_batch_choices():
+    """Варианты выбора пакета импорта: (идентификатор, подпись)"""
+    return [
+        (batch['import_batch'], f"{batch['imported_at']:%d.%m.%Y %H:%M} — записей: {batch['count']}")
+        for batch in get_import_batches()
+    ]
+
+class BulkActionForm(BulkUpdateForm):
+    """
+    Массовая операция над записями: выбранными флажками, всеми записями
+    текущего фильтра или одним пакетом импорта
+    """
+    ACTION_CHOICES = [
+        ('update', 'Изменить поле'),
+        ('delete', 'Удалить'),
+    ]
+    SCOPE_CHOICES = [
+        ('selected', 'Выбранные записи'),
+        ('filter', 'Все записи по текущему фильтру'),
+        ('import_batch', 'Пакет импорта'),
+    ]
+    
+    action = forms.ChoiceField(
+        choices=ACTION_CHOICES,
+        label='Действие',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    scope = forms.ChoiceField(
+        choices=SCOPE_CHOICES,
+        label='Записи',
+        initial='selected',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    ids = RecordIdsField(required=False)
+    import_batch = forms.ChoiceField(
+        required=False,
+        label='Пакет импорта',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Список пакетов — GROUP BY по всем импортированным записям, поэтому
+        # он строится только для отправки формы с этой областью; на странице
+        # списка варианты подгружаются по запросу (import_batch_choices)
+        self.fields['import_batch'].choices = [('', '—')]
+        if self.is_bound and self.data.get('scope') == 'import_batch':
+            self.fields['import_batch'].choices += get_import_batch_choices()
+    
+    def is_update(self, cleaned_data):
+        return cleaned_data.get('action') == 'update'
+    
+    def clean(self):
+        scope = self.cleaned_data.get('scope')
+        if scope == 'selected' and not self.cleaned_data.get('ids'):
+            raise forms.ValidationError('Не выбрано ни одной записи')
+        if scope == 'import_batch' and not self.cleaned_data.get('import_batch'):
+            raise forms.ValidationError('Выберите пакет импорта')
+        return super().clean()
@@ -0,0 +1,100 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from health_info.caching import make_row_key
+from health_info.forms import DataSourceForm
+from health_info.models import HealthData
+from health_info.views import _db_list_context
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Замер времени рендеринга страницы db_list.html без кеша фрагментов и с ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--records', type=int, default=0,
+            help='Временно добавить N синтетических записей (откатываются после замера)'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов каждого замера')
+        parser.add_argument('--page', type=int, default=1, help='Номер страницы списка')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['records']:
+                    self._seed(options['records'])
+                self._run(options['repeat'], options['page'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, count):
+        rng = random.Random(42)
+        HealthData.objects.bulk_create([
+            HealthData(
+                patient_id=f'BENCH-{i:07d}',
+                patient_name=f'Пациент {i}',
+                age=rng.randint(18, 90),
+                height=rng.uniform(150, 200),
+                weight=rng.uniform(45, 130),
+                blood_pressure_systolic=rng.randint(100, 180),
+                blood_pressure_diastolic=rng.randint(60, 99),
+                heart_rate=rng.randint(50, 110),
+                cholesterol=round(rng.uniform(3, 8), 1),
+            )
+            for i in range(count)
+        ], batch_size=1000)
+
+    def _render_page(self, request, use_cache):
+        # Контекст собирается так же, как в представлении data_list
+        context = {
+            'source_form': DataSourceForm(request.GET),
+            'source': 'db',
+            'db_records_exist': True,
+            **_db_list_context(request, use_cache=use_cache),
+        }
+        return render_to_string('health_info/db_list.html', context, request=request)
+
+    def _measure(self, repeat, func, before=None):
+        timings = []
+        for _ in range(repeat):
+            if before:
+                before()
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings), sum(timings) / len(timings)
+
+    def _run(self, repeat, page):
+        request = RequestFactory().get('/data/', {'source': 'db', 'page': page})
+        page_obj = _db_list_context(request, use_cache=False)['page_obj']
+        keys = [make_row_key(record) for record in page_obj.object_list]
+
+        results = [
+            ('Без кеша фрагментов (до)', self._measure(
+                repeat, lambda: self._render_page(request, use_cache=False))),
+            ('Кеш фрагментов, холодный', self._measure(
+                repeat, lambda: self._render_page(request, use_cache=True),
+                before=lambda: cache.delete_many(keys))),
+            ('Кеш фрагментов, тёплый (после)', self._measure(
+                repeat, lambda: self._render_page(request, use_cache=True))),
+        ]
+
+        self.stdout.write(
+            f'Страница {page_obj.number} из {page_obj.paginator.num_pages}, '
+            f'строк на странице: {len(keys)}, повторов: {repeat}'
+        )
+        for label, (best, average) in results:
+            self.stdout.write(f'{label:<34} мин {best:9.2f} мс   сред {average:9.2f} мс')
+
+        cache.delete_many(keys)
@@ -0,0 +1,35 @@
+import gzip
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from health_info.caching import invalidate_data_cache
+from health_info.utils import get_uploaded_files
+
+
+class Command(BaseCommand):
+    help = 'Сжать gzip несжатые файлы данных в хранилище загрузок (для режима HEALTH_DATA_COMPRESS_AT_REST)'
+
+    def handle(self, *args, **options):
+        before = after = compressed = 0
+        for file_info in get_uploaded_files():
+            if file_info['compressed']:
+                continue
+            source = file_info['path']
+            target = f'{source}.gz'
+            with open(source, 'rb') as src, gzip.open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            # Время изменения сохраняется, чтобы не менять порядок файлов в списке
+            os.utime(target, (file_info['modified'], file_info['modified']))
+            os.remove(source)
+            before += file_info['size']
+            after += os.path.getsize(target)
+            compressed += 1
+
+        if compressed:
+            invalidate_data_cache()
+        ratio = f', в {before / after:.1f} раза меньше' if after else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Сжато файлов: {compressed} ({before} → {after} байт{ratio})'
+        ))
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from health_info.changes import decode_cursor, encode_cursor, iter_changes
+from health_info.utils import health_data_to_dict
+
+
+class Command(BaseCommand):
+    help = (
+        'Инкрементальный экспорт: записи, созданные или изменённые после курсора, '
+        'и удаления в формате JSON Lines'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', default='', help='Курсор предыдущей выгрузки (пусто — всё)')
+        parser.add_argument(
+            '--cursor-file',
+            help='Файл с курсором: читается перед выгрузкой и перезаписывается после неё'
+        )
+        parser.add_argument('--output', help='Файл для выгрузки (по умолчанию stdout)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cursor = options['since']
+        cursor_file = options['cursor_file']
+        if cursor_file and not cursor and os.path.exists(cursor_file):
+            with open(cursor_file, 'r', encoding='utf-8') as file:
+                cursor = file.read().strip()
+
+        try:
+            updated_at, record_id, tombstone_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        upserts = deletes = 0
+        try:
+            for operation, item in iter_changes(cursor, chunk_size=options['chunk_size']):
+                if operation == 'upsert':
+                    data = health_data_to_dict(item)
+                    data['updated_at'] = item.updated_at.isoformat()
+                    line = {'op': 'upsert', 'record': data}
+                    updated_at, record_id = item.updated_at, item.id
+                    upserts += 1
+                else:
+                    line = {
+                        'op': 'delete',
+                        'patient_id': item.patient_id,
+                        'deleted_at': item.deleted_at.isoformat()
+                    }
+                    tombstone_id = item.id
+                    deletes += 1
+                output.write(json.dumps(line, ensure_ascii=False) + '\n')
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        next_cursor = encode_cursor(updated_at, record_id, tombstone_id)
+        if cursor_file:
+            with open(cursor_file, 'w', encoding='utf-8') as file:
+                file.write(next_cursor)
+
+        self.stderr.write(f'Изменено: {upserts}, удалено: {deletes}')
+        self.stderr.write(f'Следующий курсор: {next_cursor}')
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from health_info.duplicates import DEFAULT_THRESHOLD, find_duplicates, rebuild_blocking_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Найти записи, предположительно относящиеся к одному пациенту, '
+        'и сохранить пары для проверки на странице дубликатов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=float, default=DEFAULT_THRESHOLD,
+            help=f'Минимальная оценка сходства пары (по умолчанию {DEFAULT_THRESHOLD})'
+        )
+        parser.add_argument(
+            '--rebuild-index', action='store_true',
+            help='Перед поиском перестроить индекс блокировки по всем записям'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['rebuild_index']:
+            keys = rebuild_blocking_index()
+            self.stdout.write(f'Ключей блокировки: {keys}')
+
+        compared, found = find_duplicates(options['threshold'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Сравнено пар: {compared}')
+        self.stdout.write(self.style.SUCCESS(f'Пар на проверке: {found} ({elapsed:.1f} с)'))
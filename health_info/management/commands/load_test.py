@@ -0,0 +1,361 @@
+import http.cookiejar
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+
+from health_info.bulk import bulk_delete
+from health_info.models import HealthData, HealthDataTombstone
+from health_info.utils import get_upload_directory
+
+DEFAULT_MIX = 'list=40,search=30,analyze=10,input=15,upload=5'
+LOCKED_MESSAGE = 'database is locked'
+SEARCH_NAMES = ['Иванов', 'Петрова', 'Смирнов', 'Кузнецова', 'Попов', 'Соколова']
+
+
+def parse_mix(value):
+    """Смесь сценариев 'list=40,search=30' → {'list': 40, 'search': 30}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(f'Неизвестный сценарий {name!r}; доступны: {", ".join(SCENARIOS)}')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Некорректный вес сценария {name!r}: {weight!r}')
+    if not any(weight > 0 for weight in mix.values()):
+        raise CommandError('Сумма весов сценариев должна быть положительной')
+    return mix
+
+
+def make_patient(prefix, rng):
+    return {
+        'patient_id': f'{prefix}{uuid.uuid4().hex[:12]}',
+        'patient_name': f'{rng.choice(SEARCH_NAMES)} Нагрузочный',
+        'age': rng.randint(18, 90),
+        'height': round(rng.uniform(150, 200), 1),
+        'weight': round(rng.uniform(45, 130), 1),
+        'blood_pressure_systolic': rng.randint(100, 180),
+        'blood_pressure_diastolic': rng.randint(60, 99),
+        'heart_rate': rng.randint(50, 110),
+        'cholesterol': round(rng.uniform(3, 8), 1),
+    }
+
+
+class WSGITransport:
+    """Запросы к WSGI-приложению в том же процессе (django.test.Client)"""
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, data=None, files=None, headers=None):
+        if method == 'GET':
+            response = self.client.get(path, data, headers=headers)
+        else:
+            payload = dict(data or {})
+            for name, (filename, content) in (files or {}).items():
+                payload[name] = SimpleUploadedFile(filename, content)
+            response = self.client.post(path, payload, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        error = repr(response.exc_info[1]) if getattr(response, 'exc_info', None) else ''
+        return response.status_code, body, error
+
+
+class HTTPTransport:
+    """Запросы к запущенному серверу (runserver, gunicorn) по HTTP"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies),
+            NoRedirectHandler
+        )
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        # Форма ввода выставляет cookie с CSRF-токеном
+        self.request('GET', '/input/')
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data=None, files=None, headers=None):
+        url = self.base_url + path
+        headers = dict(headers or {})
+        body = None
+        if method == 'GET':
+            if data:
+                url += '?' + urllib.parse.urlencode(data)
+        else:
+            headers['X-CSRFToken'] = self.csrf_token()
+            headers['Referer'] = self.base_url + '/'
+            body, headers['Content-Type'] = encode_multipart(data or {}, files or {})
+        request = urllib.request.Request(url, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read(), ''
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), ''
+        except (urllib.error.URLError, OSError) as e:
+            return 0, b'', repr(e)
+
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Редирект после POST засчитывается как ответ, а не как новый запрос"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def encode_multipart(data, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in data.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8') + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Worker:
+    """
+    Замкнутый цикл одного виртуального пользователя: следующий запрос
+    отправляется только после ответа на предыдущий (и паузы think_time)
+    """
+
+    def __init__(self, transport, mix, prefix, think_time, seed):
+        self.transport = transport
+        self.scenarios = list(mix)
+        self.weights = list(mix.values())
+        self.prefix = prefix
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self.samples = defaultdict(list)
+
+    def call(self, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, body, error = self.transport.request(method, path, **kwargs)
+        except Exception as e:
+            status, body, error = 0, b'', repr(e)
+        latency = (time.perf_counter() - started) * 1000
+        locked = LOCKED_MESSAGE in error or LOCKED_MESSAGE.encode('utf-8') in body
+        failed = status == 0 or status >= 400 or bool(error)
+        self.samples[endpoint].append((latency, failed, locked))
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(self.scenarios, self.weights)[0]
+            SCENARIOS[scenario](self)
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+        return self.samples
+
+    def list(self):
+        self.call('data_list', 'GET', '/data/', data={'source': 'db', 'page': self.rng.randint(1, 5)})
+
+    def search(self):
+        # Поиск по мере ввода: запрос на каждую новую букву
+        name = self.rng.choice(SEARCH_NAMES)
+        for length in range(2, len(name) + 1):
+            self.call(
+                'ajax_search', 'GET', '/ajax-search/', data={'q': name[:length]},
+                headers={'X-Requested-With': 'XMLHttpRequest'}
+            )
+
+    def analyze(self):
+        self.call('analyze_data', 'GET', '/analyze/')
+
+    def input(self):
+        data = make_patient(self.prefix, self.rng)
+        data['location'] = 'db'
+        self.call('input_data', 'POST', '/input/', data=data)
+
+    def upload(self):
+        content = json.dumps(make_patient(self.prefix, self.rng), ensure_ascii=False).encode('utf-8')
+        self.call(
+            'upload_file', 'POST', '/upload/', data={'file_type': 'json'},
+            files={'file': (f'{self.prefix}upload.json', content)}
+        )
+
+
+SCENARIOS = {
+    'list': Worker.list,
+    'search': Worker.search,
+    'analyze': Worker.analyze,
+    'input': Worker.input,
+    'upload': Worker.upload,
+}
+
+
+def run_workers(options, process_index=0):
+    """Запустить потоки-пользователи одного процесса и собрать замеры"""
+    mix = parse_mix(options['mix'])
+    deadline = time.monotonic() + options['duration']
+    workers = []
+    for thread_index in range(options['concurrency']):
+        if options['url']:
+            transport = HTTPTransport(options['url'], options['timeout'])
+        else:
+            transport = WSGITransport()
+        seed = options['seed'] + process_index * 1000 + thread_index
+        workers.append(Worker(transport, mix, options['prefix'], options['think_time'], seed))
+
+    threads = [threading.Thread(target=worker.run, args=(deadline,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections.close_all()
+
+    samples = defaultdict(list)
+    for worker in workers:
+        for endpoint, values in worker.samples.items():
+            samples[endpoint].extend(values)
+    return dict(samples)
+
+
+def _process_entry(args):
+    options, process_index = args
+    return run_workers(options, process_index)
+
+
+def percentile(sorted_values, q):
+    """Перцентиль методом ближайшего ранга (как в sketches.get_percentiles)"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(round(q * len(sorted_values), 9))
+    return sorted_values[min(max(rank - 1, 0), len(sorted_values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест в замкнутом цикле: потоки (и процессы) отправляют '
+        'смесь запросов на чтение, запись, загрузку файлов и поиск. '
+        'Отчёт: пропускная способность, p50/p95/p99 и доля ошибок '
+        '«database is locked» по каждому эндпоинту.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=30, help='Длительность теста, с')
+        parser.add_argument('--concurrency', type=int, default=8, help='Потоков на процесс')
+        parser.add_argument('--processes', type=int, default=1, help='Количество процессов')
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f'Веса сценариев {", ".join(SCENARIOS)} (по умолчанию {DEFAULT_MIX})'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера (например http://127.0.0.1:8000); '
+                 'по умолчанию WSGI-приложение вызывается в этом процессе'
+        )
+        parser.add_argument('--timeout', type=float, default=30, help='Таймаут HTTP-запроса, с')
+        parser.add_argument('--think-time', type=float, default=0, help='Средняя пауза между запросами, с')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--keep-data', action='store_true',
+            help='Не удалять записи и файлы, созданные во время теста'
+        )
+
+    def handle(self, *args, **options):
+        parse_mix(options['mix'])
+        if options['concurrency'] < 1 or options['processes'] < 1:
+            raise CommandError('--concurrency и --processes должны быть положительными')
+        options['prefix'] = f'LOAD-{uuid.uuid4().hex[:6]}-'
+
+        self.stdout.write(
+            f"Цель: {options['url'] or 'WSGI в процессе'}; процессов {options['processes']} × "
+            f"потоков {options['concurrency']}; {options['duration']:g} с; смесь {options['mix']}"
+        )
+
+        started = time.perf_counter()
+        if options['processes'] == 1:
+            results = [run_workers(options)]
+        else:
+            # Дочерние процессы не должны наследовать открытые соединения с БД
+            connections.close_all()
+            context = multiprocessing.get_context('fork' if os.name == 'posix' else 'spawn')
+            with context.Pool(options['processes']) as pool:
+                results = pool.map(_process_entry, [(options, index) for index in range(options['processes'])])
+        elapsed = time.perf_counter() - started
+
+        samples = defaultdict(list)
+        for result in results:
+            for endpoint, values in result.items():
+                samples[endpoint].extend(values)
+        self._report(samples, elapsed)
+
+        if not options['keep_data']:
+            self._cleanup(options['prefix'])
+
+    def _report(self, samples, elapsed):
+        header = (
+            f"{'Эндпоинт':<14}{'запросов':>9}{'rps':>9}{'p50 мс':>9}{'p95 мс':>9}"
+            f"{'p99 мс':>9}{'ошибки':>9}{'locked':>9}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        total = failed_total = locked_total = 0
+        for endpoint in sorted(samples):
+            values = samples[endpoint]
+            latencies = sorted(latency for latency, _, _ in values)
+            failed = sum(1 for _, is_failed, _ in values if is_failed)
+            locked = sum(1 for _, _, is_locked in values if is_locked)
+            total += len(values)
+            failed_total += failed
+            locked_total += locked
+            self.stdout.write(
+                f'{endpoint:<14}{len(values):>9}{len(values) / elapsed:>9.1f}'
+                f'{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}'
+                f'{percentile(latencies, 0.99):>9.1f}'
+                f'{100 * failed / len(values):>8.1f}%{100 * locked / len(values):>8.1f}%'
+            )
+        if not total:
+            self.stdout.write('Нет выполненных запросов')
+            return
+        all_latencies = sorted(latency for values in samples.values() for latency, _, _ in values)
+        self.stdout.write('-' * len(header))
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего {total} запросов за {elapsed:.1f} с: {total / elapsed:.1f} rps, '
+            f'p50 {statistics.median(all_latencies):.1f} мс, p99 {percentile(all_latencies, 0.99):.1f} мс, '
+            f'ошибки {100 * failed_total / total:.1f}%, database is locked {100 * locked_total / total:.1f}%'
+        ))
+
+    def _cleanup(self, prefix):
+        # Надгробия тестовых записей удаляются в той же транзакции: клиенты
+        # синхронизации не должны видеть удаления синтетических пациентов
+        with transaction.atomic():
+            deleted = bulk_delete(HealthData.objects.filter(patient_id__startswith=prefix))
+            purged, _ = HealthDataTombstone.objects.filter(patient_id__startswith=prefix).delete()
+        removed = 0
+        upload_dir = get_upload_directory()
+        file_prefix = prefix.lower()
+        for filename in os.listdir(upload_dir):
+            if filename.startswith(file_prefix):
+                os.remove(os.path.join(upload_dir, filename))
+                removed += 1
+        self.stdout.write(f'Удалено тестовых записей: {deleted}, надгробий: {purged}, файлов: {removed}')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from health_info.models import HealthData, Observation
+from health_info.observations import rebuild_rollups, record_observations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать дневные и месячные агрегаты измерений по сырой истории'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Создать начальное измерение для пациентов без истории'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            without_history = HealthData.objects.exclude(
+                id__in=Observation.objects.values('patient_id')
+            )
+            created = 0
+            batch = []
+            for record in without_history.iterator(chunk_size=1000):
+                batch.append(record)
+                if len(batch) == 1000:
+                    created += len(record_observations(batch))
+                    batch = []
+            created += len(record_observations(batch))
+            self.stdout.write(f'Добавлено начальных измерений: {created}')
+
+        total = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано агрегатов: {total}'))
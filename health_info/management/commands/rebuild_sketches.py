@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from health_info.sketches import rebuild_sketches
+
+
+class Command(BaseCommand):
+    help = (
+        'Точный пересчёт гистограмм распределений показателей. '
+        'Запускайте периодически (например, из cron) для исправления расхождений.'
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_sketches()
+        self.stdout.write(self.style.SUCCESS(f'Учтено значений: {total}'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('patient_id', models.CharField(max_length=50, unique=True, verbose_name='ID пациента')),
+                ('patient_name', models.CharField(max_length=100, verbose_name='Имя пациента')),
+                ('age', models.IntegerField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(150)], verbose_name='Возраст')),
+                ('height', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Рост (см)')),
+                ('weight', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Вес (кг)')),
+                ('blood_pressure_systolic', models.IntegerField(validators=[django.core.validators.MinValueValidator(50), django.core.validators.MaxValueValidator(250)], verbose_name='Систолическое давление')),
+                ('blood_pressure_diastolic', models.IntegerField(validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(150)], verbose_name='Диастолическое давление')),
+                ('heart_rate', models.IntegerField(validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(200)], verbose_name='Частота сердечных сокращений')),
+                ('cholesterol', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Уровень холестерина')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Медицинские данные',
+                'verbose_name_plural': 'Медицинские данные',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['patient_id'], name='health_info_patient_adfd61_idx'), models.Index(fields=['patient_name'], name='health_info_patient_7c3cbe_idx'), models.Index(fields=['created_at'], name='health_info_created_80aaa0_idx')],
+            },
+        ),
+    ]
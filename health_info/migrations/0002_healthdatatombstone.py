@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HealthDataTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_id', models.BigIntegerField(verbose_name='ID записи')),
+                ('patient_id', models.CharField(max_length=50, verbose_name='ID пациента')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Время удаления')),
+            ],
+            options={
+                'verbose_name': 'Удалённая запись',
+                'verbose_name_plural': 'Удалённые записи',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='healthdata',
+            index=models.Index(fields=['updated_at', 'id'], name='health_info_updated_fb7bea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthdatatombstone',
+            index=models.Index(fields=['deleted_at'], name='health_info_deleted_e00916_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0002_healthdatatombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Observation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observed_at', models.DateTimeField(verbose_name='Время измерения')),
+                ('blood_pressure_systolic', models.IntegerField(verbose_name='Систолическое давление')),
+                ('blood_pressure_diastolic', models.IntegerField(verbose_name='Диастолическое давление')),
+                ('heart_rate', models.IntegerField(verbose_name='Частота сердечных сокращений')),
+                ('cholesterol', models.FloatField(verbose_name='Уровень холестерина')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='observations', to='health_info.healthdata', verbose_name='Пациент')),
+            ],
+            options={
+                'verbose_name': 'Измерение',
+                'verbose_name_plural': 'Измерения',
+                'ordering': ['patient', 'observed_at'],
+                'indexes': [models.Index(fields=['patient', 'observed_at'], name='health_info_patient_5baf8a_idx'), models.Index(fields=['observed_at'], name='health_info_observe_5e9282_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ObservationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'День'), ('month', 'Месяц')], max_length=5, verbose_name='Период')),
+                ('period_start', models.DateField(verbose_name='Начало периода')),
+                ('count', models.IntegerField(default=0)),
+                ('blood_pressure_systolic_sum', models.FloatField(default=0)),
+                ('blood_pressure_systolic_min', models.FloatField(null=True)),
+                ('blood_pressure_systolic_max', models.FloatField(null=True)),
+                ('blood_pressure_diastolic_sum', models.FloatField(default=0)),
+                ('blood_pressure_diastolic_min', models.FloatField(null=True)),
+                ('blood_pressure_diastolic_max', models.FloatField(null=True)),
+                ('heart_rate_sum', models.FloatField(default=0)),
+                ('heart_rate_min', models.FloatField(null=True)),
+                ('heart_rate_max', models.FloatField(null=True)),
+                ('cholesterol_sum', models.FloatField(default=0)),
+                ('cholesterol_min', models.FloatField(null=True)),
+                ('cholesterol_max', models.FloatField(null=True)),
+                ('patient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='health_info.healthdata', verbose_name='Пациент')),
+            ],
+            options={
+                'verbose_name': 'Агрегат измерений',
+                'verbose_name_plural': 'Агрегаты измерений',
+                'ordering': ['period_start'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('patient__isnull', False)), fields=('patient', 'period', 'period_start'), name='unique_patient_rollup'), models.UniqueConstraint(condition=models.Q(('patient__isnull', True)), fields=('period', 'period_start'), name='unique_population_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0003_observations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthdata',
+            index=models.Index(fields=['age', 'blood_pressure_systolic'], name='health_info_age_5ba36a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthdata',
+            index=models.Index(fields=['blood_pressure_systolic', 'blood_pressure_diastolic'], name='health_info_blood_p_12aaa3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthdata',
+            index=models.Index(fields=['cholesterol', 'age'], name='health_info_cholest_a38dfe_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0004_cohort_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricSketchBin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50, verbose_name='Показатель')),
+                ('bin', models.IntegerField(verbose_name='Номер корзины')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Корзина гистограммы',
+                'verbose_name_plural': 'Корзины гистограмм',
+                'ordering': ['metric', 'bin'],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'bin'), name='unique_metric_sketch_bin')],
+            },
+        ),
+    ]
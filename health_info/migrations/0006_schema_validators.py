@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+import health_info.schema
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0005_metricsketchbin'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='healthdata',
+            name='height',
+            field=models.FloatField(validators=[health_info.schema.GreaterThanValidator(0)], verbose_name='Рост (см)'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='weight',
+            field=models.FloatField(validators=[health_info.schema.GreaterThanValidator(0)], verbose_name='Вес (кг)'),
+        ),
+    ]
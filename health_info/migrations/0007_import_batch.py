@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0006_schema_validators'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthdata',
+            name='import_batch',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32, verbose_name='Пакет импорта'),
+        ),
+        migrations.AddIndex(
+            model_name='healthdata',
+            index=models.Index(fields=['import_batch'], name='health_info_import__f410b5_idx'),
+        ),
+    ]
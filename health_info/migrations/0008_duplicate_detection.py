@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0007_import_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Оценка сходства')),
+                ('status', models.CharField(choices=[('pending', 'На проверке'), ('dismissed', 'Не дубликат')], default='pending', max_length=10, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='health_info.healthdata', verbose_name='Возможный дубликат')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='health_info.healthdata', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Возможный дубликат',
+                'verbose_name_plural': 'Возможные дубликаты',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['status', '-score'], name='health_info_status_1e06d8_idx'), models.Index(fields=['duplicate'], name='health_info_duplica_30668c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('record', 'duplicate'), name='unique_duplicate_pair'), models.CheckConstraint(condition=models.Q(('record__lt', models.F('duplicate'))), name='duplicate_pair_ordered')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PatientBlockingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, verbose_name='Ключ')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocking_keys', to='health_info.healthdata', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Ключ блокировки',
+                'verbose_name_plural': 'Ключи блокировки',
+                'indexes': [models.Index(fields=['key', 'record'], name='health_info_key_343bf2_idx')],
+            },
+        ),
+    ]
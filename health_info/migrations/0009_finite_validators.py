@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:20
+
+import django.core.validators
+import health_info.schema
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_info', '0008_duplicate_detection'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='healthdata',
+            name='age',
+            field=models.IntegerField(validators=[health_info.schema.validate_finite, django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(150)], verbose_name='Возраст'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='blood_pressure_diastolic',
+            field=models.IntegerField(validators=[health_info.schema.validate_finite, django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(150)], verbose_name='Диастолическое давление'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='blood_pressure_systolic',
+            field=models.IntegerField(validators=[health_info.schema.validate_finite, django.core.validators.MinValueValidator(50), django.core.validators.MaxValueValidator(250)], verbose_name='Систолическое давление'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='cholesterol',
+            field=models.FloatField(validators=[health_info.schema.validate_finite, django.core.validators.MinValueValidator(0)], verbose_name='Уровень холестерина'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='heart_rate',
+            field=models.IntegerField(validators=[health_info.schema.validate_finite, django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(200)], verbose_name='Частота сердечных сокращений'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='height',
+            field=models.FloatField(validators=[health_info.schema.validate_finite, health_info.schema.GreaterThanValidator(0)], verbose_name='Рост (см)'),
+        ),
+        migrations.AlterField(
+            model_name='healthdata',
+            name='weight',
+            field=models.FloatField(validators=[health_info.schema.validate_finite, health_info.schema.GreaterThanValidator(0)], verbose_name='Вес (кг)'),
+        ),
+    ]
@@ -1,53 +1,89 @@
 from django.db import models
-from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Round
+from .schema import RULES, check_pressure_order
+
+class HealthDataQuerySet(models.QuerySet):
+    def with_bmi(self):
+        """ИМТ, вычисленный в БД (для сортировки и фильтрации в SQL)"""
+        height_m = models.F('height') / 100.0
+        return self.annotate(bmi_value=models.Case(
+            models.When(height__gt=0, then=Round(models.F('weight') / (height_m * height_m), 2)),
+            default=models.Value(0.0),
+            output_field=models.FloatField()
+        ))
 
 class HealthData(models.Model):
     patient_id = models.CharField(
-        max_length=50, 
+        max_length=RULES['patient_id'].max_length,
         verbose_name="ID пациента",
         unique=True
     )
     patient_name = models.CharField(
-        max_length=100, 
+        max_length=RULES['patient_name'].max_length,
         verbose_name="Имя пациента"
     )
     age = models.IntegerField(
-        validators=[MinValueValidator(0), MaxValueValidator(150)],
+        validators=RULES['age'].validators(),
         verbose_name="Возраст"
     )
     height = models.FloatField(
-        validators=[MinValueValidator(0)],
+        validators=RULES['height'].validators(),
         verbose_name="Рост (см)"
     )
     weight = models.FloatField(
-        validators=[MinValueValidator(0)],
+        validators=RULES['weight'].validators(),
         verbose_name="Вес (кг)"
     )
     blood_pressure_systolic = models.IntegerField(
-        validators=[MinValueValidator(50), MaxValueValidator(250)],
+        validators=RULES['blood_pressure_systolic'].validators(),
         verbose_name="Систолическое давление"
     )
     blood_pressure_diastolic = models.IntegerField(
-        validators=[MinValueValidator(30), MaxValueValidator(150)],
+        validators=RULES['blood_pressure_diastolic'].validators(),
         verbose_name="Диастолическое давление"
     )
     heart_rate = models.IntegerField(
-        validators=[MinValueValidator(30), MaxValueValidator(200)],
+        validators=RULES['heart_rate'].validators(),
         verbose_name="Частота сердечных сокращений"
     )
     cholesterol = models.FloatField(
-        validators=[MinValueValidator(0)],
+        validators=RULES['cholesterol'].validators(),
         verbose_name="Уровень холестерина"
     )
+    import_batch = models.CharField(
+        max_length=32,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Пакет импорта"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = HealthDataQuerySet.as_manager()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения на момент загрузки: нужны, чтобы при изменении записи
+        # вычесть старые показатели из гистограмм распределений
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not models.DEFERRED
+        }
+        return instance
+    
+    @staticmethod
+    def calculate_bmi(height, weight):
+        """Индекс массы тела по росту (см) и весу (кг)"""
+        if height > 0:
+            return round(weight / ((height / 100) ** 2), 2)
+        return 0
+    
     @property
     def bmi(self):
         """Рассчитать индекс массы тела"""
-        if self.height > 0:
-            return round(self.weight / ((self.height / 100) ** 2), 2)
-        return 0
+        return self.calculate_bmi(self.height, self.weight)
     
     def get_bmi_category(self):
         """Получить категорию ИМТ"""
@@ -61,6 +97,9 @@ class HealthData(models.Model):
         else:
             return "Ожирение"
     
+    def clean(self):
+        check_pressure_order(self.blood_pressure_systolic, self.blood_pressure_diastolic)
+    
     def __str__(self):
         return f"{self.patient_name} ({self.patient_id})"
     
@@ -72,4 +111,208 @@ class HealthData(models.Model):
             models.Index(fields=['patient_id']),
             models.Index(fields=['patient_name']),
             models.Index(fields=['created_at']),
-        ]
\ No newline at end of file
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['import_batch']),
+            # Составные индексы под типичные фильтры когорт: диапазон по
+            # первой колонке, условие по второй проверяется прямо в индексе
+            models.Index(fields=['age', 'blood_pressure_systolic']),
+            models.Index(fields=['blood_pressure_systolic', 'blood_pressure_diastolic']),
+            models.Index(fields=['cholesterol', 'age']),
+        ]
+
+class HealthDataTombstone(models.Model):
+    """Отметка об удалении записи для инкрементальной синхронизации"""
+    record_id = models.BigIntegerField(verbose_name="ID записи")
+    patient_id = models.CharField(max_length=50, verbose_name="ID пациента")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Время удаления")
+    
+    def __str__(self):
+        return f"{self.patient_id} (удалён {self.deleted_at:%d.%m.%Y %H:%M})"
+    
+    class Meta:
+        verbose_name = "Удалённая запись"
+        verbose_name_plural = "Удалённые записи"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+class Observation(models.Model):
+    """Измерение показателей пациента в момент времени (только добавление)"""
+    patient = models.ForeignKey(
+        HealthData,
+        on_delete=models.CASCADE,
+        related_name='observations',
+        verbose_name="Пациент"
+    )
+    observed_at = models.DateTimeField(verbose_name="Время измерения")
+    blood_pressure_systolic = models.IntegerField(verbose_name="Систолическое давление")
+    blood_pressure_diastolic = models.IntegerField(verbose_name="Диастолическое давление")
+    heart_rate = models.IntegerField(verbose_name="Частота сердечных сокращений")
+    cholesterol = models.FloatField(verbose_name="Уровень холестерина")
+    
+    def __str__(self):
+        return f"{self.patient_id} @ {self.observed_at:%d.%m.%Y %H:%M}"
+    
+    class Meta:
+        verbose_name = "Измерение"
+        verbose_name_plural = "Измерения"
+        ordering = ['patient', 'observed_at']
+        indexes = [
+            models.Index(fields=['patient', 'observed_at']),
+            models.Index(fields=['observed_at']),
+        ]
+
+class ObservationRollup(models.Model):
+    """
+    Агрегат измерений за день или месяц: по пациенту или по всей
+    популяции (patient = NULL). Хранятся количество, сумма, минимум и
+    максимум, поэтому агрегат обновляется инкрементально.
+    """
+    PERIOD_DAY = 'day'
+    PERIOD_MONTH = 'month'
+    PERIOD_CHOICES = [
+        (PERIOD_DAY, 'День'),
+        (PERIOD_MONTH, 'Месяц'),
+    ]
+    METRICS = ['blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'cholesterol']
+    
+    patient = models.ForeignKey(
+        HealthData,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='rollups',
+        verbose_name="Пациент"
+    )
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES, verbose_name="Период")
+    period_start = models.DateField(verbose_name="Начало периода")
+    count = models.IntegerField(default=0)
+    
+    blood_pressure_systolic_sum = models.FloatField(default=0)
+    blood_pressure_systolic_min = models.FloatField(null=True)
+    blood_pressure_systolic_max = models.FloatField(null=True)
+    blood_pressure_diastolic_sum = models.FloatField(default=0)
+    blood_pressure_diastolic_min = models.FloatField(null=True)
+    blood_pressure_diastolic_max = models.FloatField(null=True)
+    heart_rate_sum = models.FloatField(default=0)
+    heart_rate_min = models.FloatField(null=True)
+    heart_rate_max = models.FloatField(null=True)
+    cholesterol_sum = models.FloatField(default=0)
+    cholesterol_min = models.FloatField(null=True)
+    cholesterol_max = models.FloatField(null=True)
+    
+    def average(self, metric):
+        """Среднее значение показателя за период"""
+        if not self.count:
+            return None
+        return round(getattr(self, f'{metric}_sum') / self.count, 1)
+    
+    class Meta:
+        verbose_name = "Агрегат измерений"
+        verbose_name_plural = "Агрегаты измерений"
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['patient', 'period', 'period_start'],
+                condition=models.Q(patient__isnull=False),
+                name='unique_patient_rollup'
+            ),
+            models.UniqueConstraint(
+                fields=['period', 'period_start'],
+                condition=models.Q(patient__isnull=True),
+                name='unique_population_rollup'
+            ),
+        ]
+
+
+class MetricSketchBin(models.Model):
+    """
+    Корзина гистограммы распределения показателя. Гистограммы обновляются
+    при каждой записи и позволяют получать перцентили без сортировки таблицы.
+    """
+    metric = models.CharField(max_length=50, verbose_name="Показатель")
+    bin = models.IntegerField(verbose_name="Номер корзины")
+    count = models.BigIntegerField(default=0, verbose_name="Количество")
+    
+    def __str__(self):
+        return f"{self.metric}[{self.bin}] = {self.count}"
+    
+    class Meta:
+        verbose_name = "Корзина гистограммы"
+        verbose_name_plural = "Корзины гистограмм"
+        ordering = ['metric', 'bin']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'bin'], name='unique_metric_sketch_bin'),
+        ]
+
+
+class PatientBlockingKey(models.Model):
+    """
+    Ключ блокировки для поиска дубликатов: фонетический код имени и
+    возрастная полоса. Сравниваются только записи с общим ключом.
+    """
+    record = models.ForeignKey(
+        HealthData,
+        on_delete=models.CASCADE,
+        related_name='blocking_keys',
+        verbose_name="Запись"
+    )
+    key = models.CharField(max_length=64, verbose_name="Ключ")
+    
+    def __str__(self):
+        return f"{self.key} → {self.record_id}"
+    
+    class Meta:
+        verbose_name = "Ключ блокировки"
+        verbose_name_plural = "Ключи блокировки"
+        indexes = [
+            models.Index(fields=['key', 'record']),
+        ]
+
+
+class DuplicateCandidate(models.Model):
+    """Пара записей, предположительно относящихся к одному пациенту"""
+    STATUS_PENDING = 'pending'
+    STATUS_DISMISSED = 'dismissed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'На проверке'),
+        (STATUS_DISMISSED, 'Не дубликат'),
+    ]
+    
+    record = models.ForeignKey(
+        HealthData,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Запись"
+    )
+    duplicate = models.ForeignKey(
+        HealthData,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Возможный дубликат"
+    )
+    score = models.FloatField(verbose_name="Оценка сходства")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Статус"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.record_id} ~ {self.duplicate_id} ({self.score:.2f})"
+    
+    class Meta:
+        verbose_name = "Возможный дубликат"
+        verbose_name_plural = "Возможные дубликаты"
+        ordering = ['-score']
+        constraints = [
+            # Пара хранится один раз: record_id < duplicate_id
+            models.UniqueConstraint(fields=['record', 'duplicate'], name='unique_duplicate_pair'),
+            models.CheckConstraint(condition=models.Q(record__lt=models.F('duplicate')), name='duplicate_pair_ordered'),
+        ]
+        indexes = [
+            models.Index(fields=['status', '-score']),
+            models.Index(fields=['duplicate']),
+        ]
@@ -0,0 +1,223 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Greatest, Least, TruncDay, TruncMonth
+from django.utils import timezone
+
+from .models import Observation, ObservationRollup
+
+METRICS = ObservationRollup.METRICS
+PERIOD_TRUNCATORS = {
+    ObservationRollup.PERIOD_DAY: TruncDay,
+    ObservationRollup.PERIOD_MONTH: TruncMonth,
+}
+
+
+def get_period_start(observed_at, period):
+    """Начало дневного или месячного интервала, в который попадает измерение"""
+    day = timezone.localdate(observed_at)
+    if period == ObservationRollup.PERIOD_MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def record_observations(records, observed_at=None):
+    """
+    Добавить измерения для записей HealthData и инкрементально обновить
+    агрегаты. По умолчанию время измерения — updated_at записи.
+    """
+    observations = [
+        Observation(
+            patient_id=record.pk,
+            observed_at=observed_at or record.updated_at,
+            **{metric: getattr(record, metric) for metric in METRICS}
+        )
+        for record in records
+    ]
+    if not observations:
+        return []
+
+    with transaction.atomic():
+        Observation.objects.bulk_create(observations, batch_size=500)
+        update_rollups(observations)
+    return observations
+
+
+def record_observation_if_changed(record):
+    """
+    Записать измерение, если показатели отличаются от последнего
+    сохранённого (правка имени не создаёт новую точку истории)
+    """
+    latest = (
+        Observation.objects.filter(patient_id=record.pk)
+        .order_by('-observed_at')
+        .values(*METRICS)
+        .first()
+    )
+    current = {metric: getattr(record, metric) for metric in METRICS}
+    if latest != current:
+        record_observations([record])
+
+
+def _bucket_deltas(observations):
+    """Сгруппировать измерения по агрегатам (пациент/популяция, период)"""
+    deltas = defaultdict(lambda: {'count': 0, 'sum': defaultdict(float), 'min': {}, 'max': {}})
+    for observation in observations:
+        for period in PERIOD_TRUNCATORS:
+            period_start = get_period_start(observation.observed_at, period)
+            for patient_id in (observation.patient_id, None):
+                delta = deltas[(patient_id, period, period_start)]
+                delta['count'] += 1
+                for metric in METRICS:
+                    value = getattr(observation, metric)
+                    delta['sum'][metric] += value
+                    delta['min'][metric] = min(delta['min'].get(metric, value), value)
+                    delta['max'][metric] = max(delta['max'].get(metric, value), value)
+    return deltas
+
+
+def update_rollups(observations):
+    """
+    Учесть новые измерения в дневных и месячных агрегатах: один UPDATE
+    на агрегат, INSERT только для нового периода
+    """
+    for (patient_id, period, period_start), delta in _bucket_deltas(observations).items():
+        updates = {'count': F('count') + delta['count']}
+        for metric in METRICS:
+            updates[f'{metric}_sum'] = F(f'{metric}_sum') + delta['sum'][metric]
+            updates[f'{metric}_min'] = Least(F(f'{metric}_min'), delta['min'][metric])
+            updates[f'{metric}_max'] = Greatest(F(f'{metric}_max'), delta['max'][metric])
+
+        rollups = ObservationRollup.objects.filter(
+            patient_id=patient_id, period=period, period_start=period_start
+        )
+        if rollups.update(**updates):
+            continue
+
+        values = {'count': delta['count']}
+        for metric in METRICS:
+            values[f'{metric}_sum'] = delta['sum'][metric]
+            values[f'{metric}_min'] = delta['min'][metric]
+            values[f'{metric}_max'] = delta['max'][metric]
+        try:
+            with transaction.atomic():
+                ObservationRollup.objects.create(
+                    patient_id=patient_id, period=period, period_start=period_start, **values
+                )
+        except IntegrityError:
+            # Агрегат успел создать параллельный запрос
+            rollups.update(**updates)
+
+
+def _rollup_aggregates():
+    aggregates = {'count': Count('id')}
+    for metric in METRICS:
+        aggregates[f'{metric}_sum'] = Sum(metric)
+        aggregates[f'{metric}_min'] = Min(metric)
+        aggregates[f'{metric}_max'] = Max(metric)
+    return aggregates
+
+
+def _bucket_date(bucket):
+    """Начало периода из результата TruncDay/TruncMonth"""
+    if hasattr(bucket, 'date'):
+        return timezone.localtime(bucket).date() if timezone.is_aware(bucket) else bucket.date()
+    return bucket
+
+
+def remove_observations(patient_ids):
+    """
+    Удалить историю измерений записей вместе с их агрегатами и пересчитать
+    затронутые агрегаты популяции по оставшимся измерениям: по одному
+    запросу на период. Минимум и максимум нельзя уменьшить вычитанием,
+    поэтому затронутые периоды пересчитываются целиком.
+    """
+    patient_ids = list(patient_ids)
+    if not patient_ids:
+        return
+    observations = Observation.objects.filter(patient_id__in=patient_ids)
+    with transaction.atomic():
+        affected = {
+            period: list(
+                observations.annotate(bucket=truncator('observed_at'))
+                .order_by().values_list('bucket', flat=True).distinct()
+            )
+            for period, truncator in PERIOD_TRUNCATORS.items()
+        }
+        observations.delete()
+        ObservationRollup.objects.filter(patient_id__in=patient_ids).delete()
+
+        for period, truncator in PERIOD_TRUNCATORS.items():
+            if not affected[period]:
+                continue
+            rows = (
+                Observation.objects.annotate(bucket=truncator('observed_at'))
+                .filter(bucket__in=affected[period])
+                .order_by().values('bucket').annotate(**_rollup_aggregates())
+            )
+            remaining = {_bucket_date(row.pop('bucket')): row for row in rows}
+            population = ObservationRollup.objects.filter(patient__isnull=True, period=period)
+            population.filter(
+                period_start__in=[_bucket_date(bucket) for bucket in affected[period]]
+            ).exclude(period_start__in=list(remaining)).delete()
+            for period_start, values in remaining.items():
+                population.filter(period_start=period_start).update(**values)
+
+
+def rebuild_rollups():
+    """
+    Полностью пересчитать агрегаты по сырым измерениям (после загрузки
+    истории или для исправления расхождений)
+    """
+    aggregates = _rollup_aggregates()
+    rollups = []
+    for period, truncator in PERIOD_TRUNCATORS.items():
+        bucketed = Observation.objects.annotate(bucket=truncator('observed_at')).order_by()
+        for group_by in (('patient_id', 'bucket'), ('bucket',)):
+            for row in bucketed.values(*group_by).annotate(**aggregates):
+                bucket = _bucket_date(row.pop('bucket'))
+                rollups.append(ObservationRollup(period=period, period_start=bucket, **row))
+
+    with transaction.atomic():
+        ObservationRollup.objects.all().delete()
+        ObservationRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def _serialize_rollups(rollups):
+    return [
+        {
+            'period_start': rollup.period_start,
+            'count': rollup.count,
+            **{
+                metric: {
+                    'avg': rollup.average(metric),
+                    'min': getattr(rollup, f'{metric}_min'),
+                    'max': getattr(rollup, f'{metric}_max'),
+                }
+                for metric in METRICS
+            }
+        }
+        for rollup in rollups
+    ]
+
+
+def get_patient_trend(patient_id, period=ObservationRollup.PERIOD_DAY, start=None, end=None):
+    """Динамика показателей пациента по агрегатам, без чтения сырой истории"""
+    rollups = ObservationRollup.objects.filter(patient_id=patient_id, period=period)
+    if start:
+        rollups = rollups.filter(period_start__gte=start)
+    if end:
+        rollups = rollups.filter(period_start__lte=end)
+    return _serialize_rollups(rollups.order_by('period_start'))
+
+
+def get_population_trend(period=ObservationRollup.PERIOD_MONTH, start=None, end=None):
+    """Динамика показателей по всем пациентам"""
+    rollups = ObservationRollup.objects.filter(patient__isnull=True, period=period)
+    if start:
+        rollups = rollups.filter(period_start__gte=start)
+    if end:
+        rollups = rollups.filter(period_start__lte=end)
+    return _serialize_rollups(rollups.order_by('period_start'))
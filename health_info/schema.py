@@ -0,0 +1,295 @@
+"""
+Единая декларативная схема медицинских данных.
+
+Из схемы берутся валидаторы полей модели, атрибуты виджетов формы,
+проверки импортируемых файлов (по одной записи) и векторная проверка
+пакетов записей на NumPy, поэтому правила не расходятся между собой.
+"""
+import math
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.core.validators import BaseValidator, MaxValueValidator, MinValueValidator
+from django.utils.deconstruct import deconstructible
+
+PRESSURE_ORDER_MESSAGE = "Систолическое давление должно быть больше диастолического"
+
+
+@deconstructible
+class GreaterThanValidator(BaseValidator):
+    message = 'Убедитесь, что это значение больше %(limit_value)s.'
+    code = 'greater_than'
+
+    def compare(self, a, b):
+        return a <= b
+
+
+def validate_finite(value):
+    """Отклоняет NaN и бесконечность"""
+    if not math.isfinite(value):
+        raise ValidationError('Значение должно быть конечным числом.', code='not_finite')
+
+
+class TextRule:
+    """Обязательная непустая строка ограниченной длины"""
+
+    def __init__(self, name, label, max_length, message):
+        self.name = name
+        self.label = label
+        self.max_length = max_length
+        self.message = message
+
+    def check(self, value):
+        if not isinstance(value, str) or not value.strip():
+            return self.message
+        if len(value) > self.max_length:
+            return f"{self.label}: не более {self.max_length} символов"
+        return None
+
+    def check_column(self, values):
+        """Маска ошибок для столбца значений"""
+        array = np.asarray(values)
+        # Список со значениями разных типов NumPy молча приводит к строкам,
+        # поэтому векторная проверка только для столбца из одних строк
+        if array.dtype.kind == 'U' and (isinstance(values, np.ndarray) or set(map(type, values)) == {str}):
+            lengths = np.char.str_len(array)
+            blank = np.char.str_len(np.char.strip(array)) == 0
+            return blank | (lengths > self.max_length)
+        return np.fromiter((self.check(value) is not None for value in values), dtype=bool, count=len(values))
+
+
+class NumericRule:
+    """Числовое поле с границами допустимых значений"""
+
+    def __init__(self, name, label, kind, min_value=None, max_value=None, min_exclusive=False):
+        self.name = name
+        self.label = label
+        self.kind = kind
+        self.min_value = min_value
+        self.max_value = max_value
+        self.min_exclusive = min_exclusive
+
+    def validators(self):
+        """Валидаторы для поля модели"""
+        validators = [validate_finite]
+        if self.min_value is not None:
+            if self.min_exclusive:
+                validators.append(GreaterThanValidator(self.min_value))
+            else:
+                validators.append(MinValueValidator(self.min_value))
+        if self.max_value is not None:
+            validators.append(MaxValueValidator(self.max_value))
+        return validators
+
+    def widget_attrs(self):
+        """Атрибуты min/max для HTML-виджета формы"""
+        attrs = {}
+        if self.min_value is not None:
+            attrs['min'] = str(self.min_value)
+        if self.max_value is not None:
+            attrs['max'] = str(self.max_value)
+        return attrs
+
+    def coerce(self, value):
+        number = float(value)
+        if self.kind == 'int':
+            if not number.is_integer():
+                raise ValueError(value)
+            return int(number)
+        return number
+
+    @property
+    def type_message(self):
+        return f"{self.label}: значение должно быть {'целым числом' if self.kind == 'int' else 'числом'}"
+
+    @property
+    def range_message(self):
+        noun = 'целым числом' if self.kind == 'int' else 'числом'
+        if self.min_value is not None and self.max_value is not None:
+            return f"{self.label}: значение должно быть {noun} между {self.min_value} и {self.max_value}"
+        if self.min_exclusive:
+            return f"{self.label}: значение должно быть положительным {noun}"
+        return f"{self.label}: значение должно быть {noun} не меньше {self.min_value}"
+
+    def check(self, value):
+        try:
+            value = self.coerce(value)
+        except (ValueError, TypeError):
+            return self.type_message
+        # NaN и бесконечность (json.loads('1e999')) не проходят сравнения
+        # с границами, поэтому отсекаются отдельно
+        if not math.isfinite(value):
+            return self.type_message
+        if self.min_value is not None:
+            if value < self.min_value or (self.min_exclusive and value == self.min_value):
+                return self.range_message
+        if self.max_value is not None and value > self.max_value:
+            return self.range_message
+        return None
+
+    def to_array(self, values):
+        """Столбец значений в виде float64; нечисловые значения становятся NaN"""
+        try:
+            return np.asarray(values, dtype=np.float64)
+        except (ValueError, TypeError):
+            return np.fromiter((_to_float(value) for value in values), dtype=np.float64, count=len(values))
+
+    def check_column(self, values):
+        """Маска ошибок для столбца значений"""
+        array = self.to_array(values)
+        with np.errstate(invalid='ignore'):
+            bad = ~np.isfinite(array)
+            if self.kind == 'int':
+                bad |= array != np.floor(array)
+            if self.min_value is not None:
+                bad |= (array <= self.min_value) if self.min_exclusive else (array < self.min_value)
+            if self.max_value is not None:
+                bad |= array > self.max_value
+        return bad
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+TEXT_RULES = [
+    TextRule('patient_id', 'ID пациента', 50, "ID пациента должен быть непустой строкой"),
+    TextRule('patient_name', 'Имя пациента', 100, "Имя пациента должно быть непустой строкой"),
+]
+
+NUMERIC_RULES = [
+    NumericRule('age', 'Возраст', 'int', 0, 150),
+    NumericRule('height', 'Рост', 'float', 0, min_exclusive=True),
+    NumericRule('weight', 'Вес', 'float', 0, min_exclusive=True),
+    NumericRule('blood_pressure_systolic', 'Систолическое давление', 'int', 50, 250),
+    NumericRule('blood_pressure_diastolic', 'Диастолическое давление', 'int', 30, 150),
+    NumericRule('heart_rate', 'Частота сердечных сокращений', 'int', 30, 200),
+    NumericRule('cholesterol', 'Уровень холестерина', 'float', 0),
+]
+
+RULES = {rule.name: rule for rule in TEXT_RULES + NUMERIC_RULES}
+REQUIRED_FIELDS = list(RULES)
+
+# Биты маски ошибок пакетной проверки: по одному на поле и на правило
+# соотношения давлений
+ERROR_BITS = REQUIRED_FIELDS + ['pressure_order']
+
+
+def check_pressure_order(systolic, diastolic):
+    """Систолическое давление должно быть больше диастолического"""
+    if systolic is not None and diastolic is not None and systolic <= diastolic:
+        raise ValidationError(PRESSURE_ORDER_MESSAGE)
+
+
+def validate_record(data):
+    """
+    Проверка одной записи (словаря) по всем правилам схемы.
+    Возвращает словарь с приведёнными числовыми значениями.
+    """
+    for name in REQUIRED_FIELDS:
+        if name not in data:
+            raise ValidationError(f"Отсутствует обязательное поле: {name}")
+
+    cleaned = dict(data)
+    for name, rule in RULES.items():
+        message = rule.check(data[name])
+        if message:
+            raise ValidationError(message)
+        if isinstance(rule, NumericRule):
+            cleaned[name] = rule.coerce(data[name])
+
+    check_pressure_order(cleaned['blood_pressure_systolic'], cleaned['blood_pressure_diastolic'])
+    return cleaned
+
+
+class BatchValidationResult:
+    """
+    Результат пакетной проверки: маска ошибок uint16 на каждую строку,
+    бит i соответствует ERROR_BITS[i]
+    """
+
+    def __init__(self, error_mask, columns):
+        self.error_mask = error_mask
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.error_mask)
+
+    @property
+    def valid(self):
+        """Булев массив: строка прошла все проверки"""
+        return self.error_mask == 0
+
+    @property
+    def invalid_rows(self):
+        return np.flatnonzero(self.error_mask)
+
+    def errors_for(self, row):
+        """Сообщения об ошибках для строки"""
+        mask = int(self.error_mask[row])
+        messages = []
+        for bit, name in enumerate(ERROR_BITS):
+            if mask & (1 << bit):
+                if name == 'pressure_order':
+                    messages.append(PRESSURE_ORDER_MESSAGE)
+                else:
+                    rule = RULES[name]
+                    messages.append(rule.message if isinstance(rule, TextRule) else rule.range_message)
+        return messages
+
+    def errors(self):
+        """Компактный отчёт {номер строки: [сообщения]} только по ошибочным строкам"""
+        return {int(row): self.errors_for(row) for row in self.invalid_rows}
+
+    def cleaned_records(self):
+        """Корректные строки в виде словарей с приведёнными значениями"""
+        rows = self.valid
+        columns = {}
+        for name, values in self.columns.items():
+            rule = RULES[name]
+            if isinstance(rule, NumericRule):
+                array = values[rows]
+                columns[name] = (array.astype(np.int64) if rule.kind == 'int' else array).tolist()
+            else:
+                columns[name] = [value for value, ok in zip(values, rows) if ok]
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def validate_columns(columns, length=None):
+    """
+    Векторная проверка пакета в столбцовом виде: {поле: последовательность}.
+    Отсутствующий столбец помечает ошибкой все строки.
+    """
+    if length is None:
+        length = max((len(values) for values in columns.values()), default=0)
+    error_mask = np.zeros(length, dtype=np.uint16)
+    arrays = {}
+    cleaned = {}
+
+    for bit, name in enumerate(REQUIRED_FIELDS):
+        values = columns.get(name)
+        if values is None or len(values) != length:
+            error_mask |= np.uint16(1 << bit)
+            continue
+        rule = RULES[name]
+        error_mask[rule.check_column(values)] |= np.uint16(1 << bit)
+        if isinstance(rule, NumericRule):
+            arrays[name] = cleaned[name] = rule.to_array(values)
+        else:
+            cleaned[name] = values
+
+    if 'blood_pressure_systolic' in arrays and 'blood_pressure_diastolic' in arrays:
+        with np.errstate(invalid='ignore'):
+            wrong_order = arrays['blood_pressure_systolic'] <= arrays['blood_pressure_diastolic']
+        error_mask[wrong_order] |= np.uint16(1 << ERROR_BITS.index('pressure_order'))
+
+    return BatchValidationResult(error_mask, cleaned)
+
+
+def validate_batch(records):
+    """Векторная проверка списка словарей (например, записей импорта)"""
+    columns = {name: [record.get(name) for record in records] for name in REQUIRED_FIELDS}
+    return validate_columns(columns, length=len(records))
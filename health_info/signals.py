@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import invalidate_data_cache
+from .duplicates import update_blocking_keys
+from .models import HealthData, HealthDataTombstone
+from .observations import record_observation_if_changed, remove_observations
+from .sketches import record_deleted, record_saved
+
+
+@receiver(post_save, sender=HealthData)
+@receiver(post_delete, sender=HealthData)
+def health_data_changed(sender, **kwargs):
+    """Любое изменение медицинских данных делает кеш устаревшим (после фиксации)"""
+    invalidate_data_cache()
+
+
+@receiver(post_delete, sender=HealthData)
+def record_tombstone(sender, instance, **kwargs):
+    """Сохранить отметку об удалении для ленты изменений"""
+    HealthDataTombstone.objects.create(record_id=instance.pk, patient_id=instance.patient_id)
+
+
+@receiver(post_save, sender=HealthData)
+def record_observation(sender, instance, raw=False, **kwargs):
+    """Сохранить новые показатели в историю измерений"""
+    if not raw:
+        record_observation_if_changed(instance)
+
+
+@receiver(pre_delete, sender=HealthData)
+def remove_observation_history(sender, instance, **kwargs):
+    """
+    Удалить историю измерений до каскадного удаления, пока известно,
+    какие агрегаты популяции её учитывают
+    """
+    remove_observations([instance.pk])
+
+
+@receiver(post_save, sender=HealthData)
+def update_sketches_on_save(sender, instance, created, raw=False, **kwargs):
+    """Обновить гистограммы распределений показателей"""
+    if not raw:
+        record_saved(instance, created)
+
+
+@receiver(post_delete, sender=HealthData)
+def update_sketches_on_delete(sender, instance, **kwargs):
+    record_deleted(instance)
+
+
+@receiver(post_save, sender=HealthData)
+def update_blocking_keys_on_save(sender, instance, raw=False, **kwargs):
+    """Обновить ключи индекса блокировки для поиска дубликатов"""
+    if not raw:
+        update_blocking_keys([(instance.pk, instance.patient_name, instance.age)])
@@ -0,0 +1,207 @@
+"""
+Потоковые гистограммы распределений показателей.
+
+Каждый показатель хранится как гистограмма с фиксированными корзинами
+(MetricSketchBin). При добавлении, изменении и удалении записи счётчики
+соответствующих корзин увеличиваются или уменьшаются, поэтому гистограммы,
+в отличие от t-digest, корректно поддерживают изменение и удаление.
+Гистограммы разных узлов объединяются простым сложением счётчиков.
+
+Перцентиль вычисляется по накопленным счётчикам (метод ближайшего ранга),
+время ответа зависит только от числа корзин, а не от числа пациентов.
+
+Точность:
+- возраст, давление и пульс — целые числа, корзина шириной 1,
+  перцентиль совпадает с точным значением;
+- ИМТ — корзины по 0.1, погрешность не более 0.05;
+- холестерин — корзины по 0.05, погрешность не более 0.025.
+Значения за пределами диапазона попадают в крайние корзины, NaN и
+бесконечность (запись в обход проверок схемы) не учитываются. Записи,
+изменённые в обход сигналов (например, через raw SQL), вносят
+расхождение, которое устраняет периодический точный пересчёт
+(manage.py rebuild_sketches).
+"""
+import math
+from collections import Counter, namedtuple
+
+from django.db import connection, transaction
+
+from .models import HealthData, MetricSketchBin
+
+SketchSpec = namedtuple('SketchSpec', 'label lower upper width integer')
+
+SKETCH_SPECS = {
+    'age': SketchSpec('Возраст', 0, 150, 1, True),
+    'bmi': SketchSpec('ИМТ', 0, 100, 0.1, False),
+    'blood_pressure_systolic': SketchSpec('Систолическое давление', 50, 250, 1, True),
+    'blood_pressure_diastolic': SketchSpec('Диастолическое давление', 30, 150, 1, True),
+    'heart_rate': SketchSpec('Пульс', 30, 200, 1, True),
+    'cholesterol': SketchSpec('Холестерин', 0, 30, 0.05, False),
+}
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Поля записи, из которых вычисляются показатели
+SOURCE_FIELDS = (
+    'age', 'height', 'weight', 'blood_pressure_systolic',
+    'blood_pressure_diastolic', 'heart_rate', 'cholesterol'
+)
+
+
+def get_bin(metric, value):
+    """Номер корзины для значения показателя"""
+    spec = SKETCH_SPECS[metric]
+    last = int(round((spec.upper - spec.lower) / spec.width))
+    if math.isinf(value):
+        return last if value > 0 else 0
+    # Малый допуск защищает от ошибок округления вида 24.7 / 0.1 = 246.999...
+    index = math.floor((value - spec.lower) / spec.width + 1e-9)
+    return min(max(index, 0), last)
+
+
+def get_bin_value(metric, index):
+    """Представитель корзины: левая граница для целых, середина для дробных"""
+    spec = SKETCH_SPECS[metric]
+    if spec.integer:
+        return spec.lower + index * spec.width
+    return round(spec.lower + (index + 0.5) * spec.width, 3)
+
+
+def get_sketch_values(values):
+    """
+    Значения показателей из словаря полей записи. Показатели, для которых
+    не хватает полей (отложенная загрузка), пропускаются.
+    NaN и бесконечность тоже пропускаются, чтобы обновление гистограмм
+    никогда не мешало сохранению или удалению записи.
+    """
+    result = {}
+    for metric in SKETCH_SPECS:
+        if metric == 'bmi':
+            if _is_finite(values.get('height')) and _is_finite(values.get('weight')):
+                value = HealthData.calculate_bmi(values['height'], values['weight'])
+            else:
+                continue
+        else:
+            value = values.get(metric)
+        if _is_finite(value):
+            result[metric] = value
+    return result
+
+
+def _is_finite(value):
+    try:
+        return value is not None and math.isfinite(value)
+    except TypeError:
+        return False
+
+
+def get_current_values(record):
+    """Текущие значения показателей записи"""
+    return get_sketch_values({name: getattr(record, name) for name in SOURCE_FIELDS})
+
+
+def get_loaded_values(record):
+    """Значения на момент загрузки записи из БД (None для новых объектов)"""
+    loaded = getattr(record, '_loaded_values', None)
+    return get_sketch_values(loaded) if loaded else None
+
+
+def update_sketches(added=(), removed=()):
+    """
+    Применить изменения к гистограммам одним пакетным UPSERT.
+    added и removed — списки словарей {показатель: значение}.
+    """
+    deltas = Counter()
+    for values, sign in [(values, 1) for values in added] + [(values, -1) for values in removed]:
+        for metric, value in values.items():
+            if not _is_finite(value):
+                continue
+            deltas[(metric, get_bin(metric, value))] += sign
+
+    rows = [(metric, index, delta) for (metric, index), delta in deltas.items() if delta]
+    if not rows:
+        return
+
+    table = connection.ops.quote_name(MetricSketchBin._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (metric, bin, count) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (metric, bin) DO UPDATE SET count = {table}.count + excluded.count',
+            rows
+        )
+
+
+def record_saved(record, created):
+    """Учесть сохранение записи: вычесть старые показатели, добавить новые"""
+    current = get_current_values(record)
+    previous = None if created else get_loaded_values(record)
+    update_sketches(added=[current], removed=[previous] if previous else [])
+    record._loaded_values = {name: getattr(record, name) for name in SOURCE_FIELDS}
+
+
+def record_deleted(record):
+    """Учесть удаление записи"""
+    update_sketches(removed=[get_loaded_values(record) or get_current_values(record)])
+
+
+def get_percentiles(metric, quantiles=DEFAULT_QUANTILES):
+    """
+    Перцентили показателя по гистограмме: {квантиль: значение}.
+    Возвращает None, если данных нет.
+    """
+    bins = list(
+        MetricSketchBin.objects.filter(metric=metric, count__gt=0)
+        .order_by('bin')
+        .values_list('bin', 'count')
+    )
+    total = sum(count for _, count in bins)
+    if not total:
+        return None
+
+    targets = sorted(quantiles)
+    ranks = [max(1, math.ceil(round(q * total, 9))) for q in targets]
+    result = {}
+    cumulative = 0
+    position = 0
+    for index, count in bins:
+        cumulative += count
+        while position < len(targets) and cumulative >= ranks[position]:
+            result[targets[position]] = get_bin_value(metric, index)
+            position += 1
+        if position == len(targets):
+            break
+    return result
+
+
+def get_percentile_table(quantiles=DEFAULT_QUANTILES):
+    """Перцентили всех показателей для страницы анализа"""
+    table = []
+    for metric, spec in SKETCH_SPECS.items():
+        percentiles = get_percentiles(metric, quantiles)
+        if percentiles:
+            table.append({
+                'metric': metric,
+                'label': spec.label,
+                'values': [percentiles[q] for q in quantiles],
+            })
+    return table
+
+
+def rebuild_sketches():
+    """
+    Точный пересчёт гистограмм по текущим данным. Исправляет накопившиеся
+    расхождения; рекомендуется запускать периодически (например, ночью).
+    """
+    counts = Counter()
+    for row in HealthData.objects.values_list(*SOURCE_FIELDS).iterator(chunk_size=2000):
+        for metric, value in get_sketch_values(dict(zip(SOURCE_FIELDS, row))).items():
+            counts[(metric, get_bin(metric, value))] += 1
+
+    with transaction.atomic():
+        MetricSketchBin.objects.all().delete()
+        MetricSketchBin.objects.bulk_create(
+            [MetricSketchBin(metric=metric, bin=index, count=count)
+             for (metric, index), count in counts.items()],
+            batch_size=1000
+        )
+    return sum(counts.values())
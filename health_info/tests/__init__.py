@@ -0,0 +1,22 @@
+from health_info.models import HealthData
+
+
+def make_record(**changes):
+    """Поля корректной записи пациента с заменой отдельных значений"""
+    values = {
+        'patient_id': 'P-1',
+        'patient_name': 'Иванов Иван',
+        'age': 40,
+        'height': 175.0,
+        'weight': 70.0,
+        'blood_pressure_systolic': 120,
+        'blood_pressure_diastolic': 80,
+        'heart_rate': 70,
+        'cholesterol': 5.0,
+    }
+    values.update(changes)
+    return values
+
+
+def create_record(**changes):
+    return HealthData.objects.create(**make_record(**changes))
@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from health_info.models import HealthData
+from health_info.tests import make_record
+
+
+class BatchApiTests(APITestCase):
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user('api'))
+
+    def test_non_object_body_rejected(self):
+        for body in ([1, 2], 'text', 5):
+            with self.subTest(body=body):
+                response = self.client.post('/api/v1/health-data/batch/', body, format='json')
+                self.assertEqual(response.status_code, 400)
+
+
+class ApiAuthenticationTests(APITestCase):
+    """Анонимные клиенты не получают доступа к медицинским данным"""
+
+    record = make_record(patient_id='ANON-1')
+
+    def test_anonymous_writes_rejected(self):
+        requests = [
+            ('post', '/api/v1/health-data/', self.record, 'multipart'),
+            ('post', '/api/v1/health-data/', self.record, 'json'),
+            ('post', '/api/v1/health-data/batch/', {'create': [self.record], 'delete': ['X']}, 'json'),
+            ('delete', '/api/v1/health-data/1/', None, 'json'),
+        ]
+        for method, url, data, fmt in requests:
+            with self.subTest(method=method, url=url, format=fmt):
+                response = getattr(self.client, method)(url, data, format=fmt)
+                self.assertEqual(response.status_code, 401)
+        self.assertFalse(HealthData.objects.exists())
+
+    def test_anonymous_reads_rejected(self):
+        self.assertEqual(self.client.get('/api/v1/health-data/').status_code, 401)
+
+    def test_jwt_client_can_write(self):
+        User.objects.create_user('doctor', password='secret-password')
+        token = self.client.post(
+            '/api/v1/token/', {'username': 'doctor', 'password': 'secret-password'}, format='json'
+        ).data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post('/api/v1/health-data/', self.record, format='json')
+        self.assertEqual(response.status_code, 201)
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from health_info import bulk
+from health_info.bulk import PartialBulkOperation, bulk_delete, bulk_update
+from health_info.models import HealthData, HealthDataTombstone
+from health_info.tests import create_record
+
+
+def fail_on_call(number):
+    """Заменитель update_sketches, падающий на вызове с номером number"""
+    calls = []
+
+    def update_sketches(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == number:
+            raise RuntimeError('сбой')
+    return update_sketches
+
+
+class BulkTransactionTests(TestCase):
+
+    def setUp(self):
+        for index in range(3):
+            create_record(patient_id=f'B-{index}')
+
+    def test_delete_creates_tombstones(self):
+        self.assertEqual(bulk_delete(HealthData.objects.all(), chunk_size=2), 3)
+        self.assertFalse(HealthData.objects.exists())
+        self.assertEqual(HealthDataTombstone.objects.count(), 3)
+
+    def test_failure_within_limit_rolls_back_everything(self):
+        with mock.patch.object(bulk, 'update_sketches', fail_on_call(2)):
+            with self.assertRaises(RuntimeError):
+                bulk_delete(HealthData.objects.all(), chunk_size=1)
+        self.assertEqual(HealthData.objects.count(), 3)
+        self.assertFalse(HealthDataTombstone.objects.exists())
+
+    def test_failure_beyond_limit_reports_progress(self):
+        with mock.patch.object(bulk, 'update_sketches', fail_on_call(3)):
+            with self.assertRaises(PartialBulkOperation) as context:
+                bulk_delete(HealthData.objects.all(), chunk_size=1, limit=2)
+        self.assertEqual(context.exception.processed, 2)
+        self.assertEqual(HealthData.objects.count(), 1)
+
+    def test_update_failure_rolls_back_everything(self):
+        with mock.patch.object(bulk, 'update_sketches', fail_on_call(2)):
+            with self.assertRaises(RuntimeError):
+                bulk_update(HealthData.objects.all(), {'heart_rate': 90}, chunk_size=1)
+        self.assertFalse(HealthData.objects.filter(heart_rate=90).exists())
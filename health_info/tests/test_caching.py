@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from health_info.cache_backends import SQLiteCache
+
+from health_info.caching import deferred_invalidation, get_data_generation, invalidate_data_cache
+from health_info.models import HealthData
+from health_info.tests import create_record
+
+
+class CommitInvalidationTests(TestCase):
+    """Поколение кеша меняется только после фиксации транзакции"""
+
+    def test_delete_invalidates_after_commit(self):
+        record = create_record()
+        before = get_data_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+            self.assertEqual(get_data_generation(), before)
+        self.assertNotEqual(get_data_generation(), before)
+
+    def test_rollback_keeps_generation(self):
+        before = get_data_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    create_record()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(get_data_generation(), before)
+        self.assertFalse(HealthData.objects.exists())
+
+    def test_deferred_invalidation_after_commit(self):
+        before = get_data_generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_invalidation():
+                invalidate_data_cache()
+                invalidate_data_cache()
+            self.assertEqual(get_data_generation(), before)
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(get_data_generation(), before)
+
+
+class SQLiteCacheTouchTests(SimpleTestCase):
+    """Попадание в кеш не пишет в файл, пока отметка LRU свежая"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = SQLiteCache(os.path.join(directory.name, 'cache.sqlite3'), {'OPTIONS': {'TOUCH_INTERVAL': 60}})
+        self.cache.set('key', 'value')
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.conn = self.cache._connection()
+
+    def test_fresh_hits_do_not_write(self):
+        changes = self.conn.total_changes
+        for _ in range(5):
+            self.assertEqual(self.cache.get('key'), 'value')
+            self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        self.assertEqual(self.conn.total_changes, changes)
+
+    def test_stale_hits_touch(self):
+        self.conn.execute('UPDATE cache SET accessed = accessed - 120')
+        changes = self.conn.total_changes
+        self.cache.get('key')
+        self.cache.get_many(['a', 'b'])
+        self.assertEqual(self.conn.total_changes, changes + 3)
+        self.cache.get('key')
+        self.assertEqual(self.conn.total_changes, changes + 3)
@@ -0,0 +1,45 @@
+import io
+import math
+
+from django.test import SimpleTestCase, TestCase
+
+from health_info.management.commands.load_test import Command, percentile
+from health_info.models import HealthData, HealthDataTombstone
+from health_info.tests import create_record
+
+
+class PercentileTests(SimpleTestCase):
+
+    def reference(self, values, q):
+        return values[max(0, math.ceil(round(q * len(values), 9)) - 1)]
+
+    def test_nearest_rank(self):
+        values = list(range(1, 103))
+        self.assertEqual(percentile(values, 0.5), 51)
+        self.assertEqual(percentile(values, 0.95), 97)
+        self.assertEqual(percentile(values, 0.99), 101)
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+
+    def test_matches_reference_for_all_sizes(self):
+        for size in range(1, 300):
+            values = list(range(size))
+            for q in (0.0, 0.5, 0.95, 0.99, 1.0):
+                with self.subTest(size=size, q=q):
+                    self.assertEqual(percentile(values, q), self.reference(values, q))
+
+    def test_empty(self):
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+class CleanupTests(TestCase):
+
+    def test_removes_records_without_leaving_tombstones(self):
+        create_record(patient_id='LT-TEST-1')
+        create_record(patient_id='LT-TEST-2')
+        create_record(patient_id='P-1')
+        HealthData.objects.get(patient_id='P-1').delete()
+
+        Command(stdout=io.StringIO())._cleanup('LT-TEST-')
+
+        self.assertFalse(HealthData.objects.filter(patient_id__startswith='LT-TEST-').exists())
+        self.assertEqual(list(HealthDataTombstone.objects.values_list('patient_id', flat=True)), ['P-1'])
@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from health_info.bulk import bulk_delete
+from health_info.models import HealthData, ObservationRollup
+from health_info.observations import rebuild_rollups
+from health_info.tests import create_record
+
+
+def rollup_snapshot():
+    fields = [field.name for field in ObservationRollup._meta.fields if field.name != 'id']
+    return sorted(
+        ObservationRollup.objects.values_list(*fields),
+        key=lambda row: tuple(str(value) for value in row)
+    )
+
+
+class RollupDeleteTests(TestCase):
+    """Инкрементальные агрегаты совпадают с полным пересчётом после удалений"""
+
+    def setUp(self):
+        self.records = [
+            create_record(patient_id='R-1', blood_pressure_systolic=110),
+            create_record(patient_id='R-2', blood_pressure_systolic=160, cholesterol=7.5),
+            create_record(patient_id='R-3', blood_pressure_systolic=135),
+        ]
+        for record in self.records:
+            record.heart_rate += 10
+            record.save()
+
+    def assert_matches_rebuild(self):
+        incremental = rollup_snapshot()
+        rebuild_rollups()
+        self.assertEqual(incremental, rollup_snapshot())
+
+    def test_instance_delete(self):
+        self.records[1].delete()
+        self.assert_matches_rebuild()
+        population = ObservationRollup.objects.filter(patient__isnull=True, period=ObservationRollup.PERIOD_DAY)
+        self.assertEqual(population.get().count, 4)
+
+    def test_queryset_delete(self):
+        HealthData.objects.filter(patient_id__in=['R-1', 'R-2']).delete()
+        self.assert_matches_rebuild()
+
+    def test_delete_all(self):
+        HealthData.objects.all().delete()
+        self.assertFalse(ObservationRollup.objects.exists())
+
+    def test_bulk_delete(self):
+        bulk_delete(HealthData.objects.filter(patient_id__in=['R-1', 'R-3']))
+        self.assert_matches_rebuild()
+        population = ObservationRollup.objects.filter(patient__isnull=True, period=ObservationRollup.PERIOD_MONTH)
+        self.assertEqual(population.get().count, 2)
@@ -0,0 +1,47 @@
+import json
+import math
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from health_info.schema import validate_batch, validate_record
+from health_info.tests import make_record
+
+
+class ValidationParityTests(SimpleTestCase):
+    """Проверка одной записи и пакетная проверка дают одинаковый результат"""
+
+    rows = [
+        make_record(),
+        make_record(height=math.nan),
+        make_record(height=math.inf),
+        make_record(weight=-math.inf),
+        make_record(cholesterol=json.loads('1e999')),
+        make_record(age=math.nan),
+        make_record(blood_pressure_systolic=math.inf),
+        make_record(heart_rate='abc'),
+        make_record(age=40.5),
+        make_record(age=151),
+        make_record(blood_pressure_systolic=80),
+        make_record(patient_name=' '),
+        make_record(height=0),
+        make_record(cholesterol='5.5'),
+    ]
+
+    def test_record_and_batch_agree(self):
+        result = validate_batch(self.rows)
+        for index, data in enumerate(self.rows):
+            try:
+                validate_record(data)
+                record_valid = True
+            except ValidationError:
+                record_valid = False
+            with self.subTest(row=data):
+                self.assertEqual(bool(result.valid[index]), record_valid)
+
+    def test_non_finite_values_rejected(self):
+        for data in self.rows[1:7]:
+            with self.subTest(row=data):
+                with self.assertRaises(ValidationError):
+                    validate_record(data)
+        self.assertFalse(validate_batch(self.rows[1:7]).valid.any())
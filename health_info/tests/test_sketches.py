@@ -0,0 +1,29 @@
+import math
+
+from django.test import TestCase
+
+from health_info.models import HealthData, MetricSketchBin
+from health_info.sketches import get_bin, rebuild_sketches
+from health_info.tests import create_record
+
+
+class NonFiniteSketchTests(TestCase):
+    """Запись с бесконечным значением (в обход проверок) сохраняется и удаляется"""
+
+    def test_get_bin_clamps_infinity(self):
+        self.assertEqual(get_bin('cholesterol', -math.inf), 0)
+        self.assertEqual(get_bin('cholesterol', math.inf), get_bin('cholesterol', 30))
+
+    def test_save_and_delete_with_infinite_value(self):
+        record = create_record(cholesterol=math.inf)
+        self.assertFalse(MetricSketchBin.objects.filter(metric='cholesterol').exclude(count=0).exists())
+        self.assertEqual(MetricSketchBin.objects.get(metric='age', bin=40).count, 1)
+
+        record.delete()
+        self.assertFalse(HealthData.objects.exists())
+        self.assertFalse(MetricSketchBin.objects.exclude(count=0).exists())
+
+    def test_rebuild_skips_infinite_value(self):
+        create_record(height=math.inf)
+        self.assertEqual(rebuild_sketches(), 5)
+        self.assertFalse(MetricSketchBin.objects.filter(metric='bmi').exists())
@@ -0,0 +1,112 @@
+import gzip
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from health_info.models import HealthData
+from health_info.tests import create_record, make_record
+from health_info.utils import get_upload_directory
+
+
+class CohortFilterViewTests(TestCase):
+    """Некорректный фильтр когорты обрабатывается одинаково на странице и в рядах"""
+
+    def setUp(self):
+        create_record(patient_id='V-1')
+
+    def test_invalid_cohort_shows_field_errors(self):
+        response = self.client.get('/analyze/', {'age_min': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'invalid-feedback', status_code=400)
+        self.assertNotContains(response, 'Всего пациентов', status_code=400)
+        self.assertNotContains(response, 'analyze/series/', status_code=400)
+        self.assertEqual(self.client.get('/analyze/series/', {'age_min': 'abc'}).status_code, 400)
+
+    def test_invalid_cohort_on_data_list(self):
+        response = self.client.get('/data/', {'source': 'db', 'age_min': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'invalid-feedback', status_code=400)
+        self.assertNotContains(response, 'V-1', status_code=400)
+        self.assertContains(self.client.get('/data/', {'source': 'db', 'age_min': '30'}), 'V-1')
+
+    def test_valid_cohort(self):
+        response = self.client.get('/analyze/', {'age_min': '30'})
+        self.assertContains(response, 'Всего пациентов')
+        self.assertEqual(self.client.get('/analyze/series/', {'age_min': '30'}).status_code, 200)
+
+
+class DownloadFileTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_upper_case_compressed_extension(self):
+        with gzip.open(os.path.join(get_upload_directory(), 'export.JSON.gz'), 'wb') as f:
+            f.write(b'{"patient_id": "V-1"}')
+        response = self.client.get('/download/export.JSON.gz/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/json'))
+        self.assertEqual(b''.join(response.streaming_content), b'{"patient_id": "V-1"}')
+
+
+class InputDuplicateWarningTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        create_record(patient_id='D-1')
+
+    def test_every_location_warns(self):
+        for index, location in enumerate(('db', 'file'), start=2):
+            with self.subTest(location=location):
+                data = make_record(patient_id=f'D-{index}', age=41, weight=71.0, location=location)
+                response = self.client.post('/input/', data, follow=True)
+                self.assertContains(response, 'Возможные дубликаты')
+
+
+class ConditionalListTests(TestCase):
+
+    def test_delete_of_latest_record_is_a_modification(self):
+        create_record(patient_id='C-1')
+        latest = create_record(patient_id='C-2')
+        # Заголовок Last-Modified с точностью до секунды: записи «старше»
+        HealthData.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get('/data/', {'source': 'db'})
+        last_modified = response['Last-Modified']
+
+        latest.delete()
+        response = self.client.get('/data/', {'source': 'db'}, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'C-2')
+
+
+class ImportBatchChoicesTests(TestCase):
+
+    def setUp(self):
+        create_record(patient_id='I-1', import_batch='batch-1')
+        create_record(patient_id='I-2', import_batch='batch-1')
+
+    def test_list_page_does_not_group_import_batches(self):
+        with mock.patch('health_info.forms.get_import_batches') as get_import_batches:
+            self.client.get('/data/', {'source': 'db'})
+        get_import_batches.assert_not_called()
+
+    def test_choices_endpoint(self):
+        choices = self.client.get('/bulk/import-batches/').json()['choices']
+        self.assertEqual([choice['value'] for choice in choices], ['batch-1'])
+        self.assertIn('записей: 2', choices[0]['label'])
+
+    def test_bulk_delete_by_import_batch(self):
+        self.client.post('/bulk/', {'action': 'delete', 'scope': 'import_batch', 'import_batch': 'batch-1'})
+        self.assertFalse(HealthData.objects.exists())
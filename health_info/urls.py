@@ -11,5 +11,12 @@ urlpatterns = [
     path('ajax-search/', views.ajax_search, name='ajax_search'),
     path('edit/<int:record_id>/', views.edit_record, name='edit_record'),
     path('delete/<int:record_id>/', views.delete_record, name='delete_record'),
+    path('bulk/', views.bulk_action, name='bulk_action'),
+    path('bulk/import-batches/', views.import_batch_choices, name='import_batch_choices'),
+    path('export/<int:record_id>/<str:file_format>/', views.export_record, name='export_record'),
+    path('download/<str:filename>/', views.download_file, name='download_file'),
+    path('duplicates/', views.duplicate_list, name='duplicate_list'),
+    path('duplicates/<int:candidate_id>/', views.resolve_duplicate, name='resolve_duplicate'),
     path('analyze/', views.analyze_data, name='analyze_data'),
+    path('analyze/series/', views.analyze_series, name='analyze_series'),
 ]
\ No newline at end of file
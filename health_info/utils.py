@@ -1,59 +1,44 @@
+import asyncio
+import gzip
 import json
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 import os
 import re
 import uuid
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from .models import HealthData
+from django.db.models import Count, Max
+from .models import HealthData, HealthDataTombstone
+from .schema import validate_record
+
+# Форматы файлов данных, в том числе сжатые gzip
+FILE_EXTENSIONS = {
+    '.json': 'JSON',
+    '.xml': 'XML',
+    '.json.gz': 'JSON',
+    '.xml.gz': 'XML',
+}
+# Предел размера распакованного файла: защита от «zip-бомб»
+MAX_DECOMPRESSED_SIZE = 50 * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+GZIP_ACCEPTED = re.compile(r'\bgzip\b')
 
 def validate_health_data(data):
     """
-    Валидация медицинских данных
+    Валидация медицинских данных по общей схеме (health_info.schema).
+    Возвращает данные с приведёнными числовыми значениями.
     """
-    required_fields = [
-        'patient_id', 'patient_name', 'age', 'height', 'weight',
-        'blood_pressure_systolic', 'blood_pressure_diastolic', 
-        'heart_rate', 'cholesterol'
-    ]
-    
-    for field in required_fields:
-        if field not in data:
-            raise ValidationError(f"Отсутствует обязательное поле: {field}")
-    
-    if not isinstance(data['patient_id'], str) or not data['patient_id'].strip():
-        raise ValidationError("ID пациента должен быть непустой строкой")
-    
-    if not isinstance(data['patient_name'], str) or not data['patient_name'].strip():
-        raise ValidationError("Имя пациента должно быть непустой строкой")
-    
-    try:
-        age = int(data['age'])
-        if age < 0 or age > 150:
-            raise ValidationError("Возраст должен быть между 0 и 150")
-    except (ValueError, TypeError):
-        raise ValidationError("Возраст должен быть целым числом")
-    
-    try:
-        height = float(data['height'])
-        if height <= 0:
-            raise ValidationError("Рост должен быть положительным числом")
-    except (ValueError, TypeError):
-        raise ValidationError("Рост должен быть числом")
-    
-    try:
-        weight = float(data['weight'])
-        if weight <= 0:
-            raise ValidationError("Вес должен быть положительным числом")
-    except (ValueError, TypeError):
-        raise ValidationError("Вес должен быть числом")
+    return validate_record(data)
 
-def export_to_json(health_data):
+def health_data_to_dict(health_data):
     """
-    Экспорт данных в JSON формат
+    Представление записи в виде словаря для экспорта
     """
-    data = {
+    return {
         'patient_id': health_data.patient_id,
         'patient_name': health_data.patient_name,
         'age': health_data.age,
@@ -67,7 +52,12 @@ def export_to_json(health_data):
         'bmi_category': health_data.get_bmi_category(),
         'created_at': health_data.created_at.isoformat()
     }
-    return json.dumps(data, ensure_ascii=False, indent=2)
+
+def export_to_json(health_data):
+    """
+    Экспорт данных в JSON формат
+    """
+    return json.dumps(health_data_to_dict(health_data), ensure_ascii=False, indent=2)
 
 def export_to_xml(health_data):
     """
@@ -92,16 +82,73 @@ def export_to_xml(health_data):
     reparsed = minidom.parseString(rough_string)
     return reparsed.toprettyxml(indent="  ")
 
+def get_file_extension(filename):
+    """Расширение файла данных с учётом сжатия (.json.gz) или None"""
+    lowered = filename.lower()
+    for extension in sorted(FILE_EXTENSIONS, key=len, reverse=True):
+        if lowered.endswith(extension):
+            return extension
+    return None
+
+def is_compressed(filename):
+    return filename.lower().endswith('.gz')
+
+def open_data_file(file_path):
+    """Открыть файл данных на чтение; .gz распаковывается на лету"""
+    if is_compressed(file_path):
+        return gzip.open(file_path, 'rb')
+    return open(file_path, 'rb')
+
+def read_data_file(file_path):
+    """
+    Прочитать содержимое файла данных порциями с распаковкой и
+    ограничением размера
+    """
+    content = bytearray()
+    with open_data_file(file_path) as file:
+        while chunk := file.read(READ_CHUNK_SIZE):
+            content.extend(chunk)
+            if len(content) > MAX_DECOMPRESSED_SIZE:
+                raise ValidationError("Распакованный файл слишком большой")
+    return bytes(content)
+
+def compress_at_rest():
+    """Включено ли хранение файлов данных в сжатом виде"""
+    return getattr(settings, 'HEALTH_DATA_COMPRESS_AT_REST', False)
+
+def write_data_file(file_path, chunks):
+    """
+    Записать файл данных из последовательности байтовых порций.
+    Сжатые файлы (.gz) сохраняются как есть, остальные в режиме сжатого
+    хранения сжимаются при записи и получают расширение .gz.
+    Возвращает фактический путь к файлу.
+    """
+    opener = open
+    if compress_at_rest() and not is_compressed(file_path):
+        file_path += '.gz'
+        opener = gzip.open
+    try:
+        with opener(file_path, 'wb') as destination:
+            for chunk in chunks:
+                destination.write(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return file_path
+
+def accepts_gzip(request):
+    """Клиент принимает ответы, сжатые gzip"""
+    return bool(GZIP_ACCEPTED.search(request.headers.get('Accept-Encoding', '')))
+
 def import_from_json(file_path):
     """
-    Импорт данных из JSON файла
+    Импорт данных из JSON файла (в том числе .json.gz)
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        data = json.loads(read_data_file(file_path))
         
-        validate_health_data(data)
-        return data
+        return validate_health_data(data)
     except json.JSONDecodeError as e:
         raise ValidationError(f"Ошибка декодирования JSON: {str(e)}")
     except ValidationError:
@@ -111,31 +158,17 @@ def import_from_json(file_path):
 
 def import_from_xml(file_path):
     """
-    Импорт данных из XML файла
+    Импорт данных из XML файла (в том числе .xml.gz)
     """
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
+        root = ET.fromstring(read_data_file(file_path))
         
         data = {}
         for child in root:
             data[child.tag] = child.text
         
-        numeric_fields = ['age', 'height', 'weight', 'blood_pressure_systolic', 
-                         'blood_pressure_diastolic', 'heart_rate', 'cholesterol']
-        
-        for field in numeric_fields:
-            if field in data:
-                try:
-                    if field in ['age', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate']:
-                        data[field] = int(data[field])
-                    else:
-                        data[field] = float(data[field])
-                except (ValueError, TypeError):
-                    raise ValidationError(f"Некорректное числовое значение для поля {field}")
-        
-        validate_health_data(data)
-        return data
+        # Числовые значения приводятся к типам схемы при валидации
+        return validate_health_data(data)
     except ET.ParseError as e:
         raise ValidationError(f"Ошибка парсинга XML: {str(e)}")
     except ValidationError:
@@ -155,7 +188,11 @@ def sanitize_filename(filename):
     """
     Санитайзинг имени файла
     """
-    name, ext = os.path.splitext(filename)
+    ext = get_file_extension(filename)
+    if ext:
+        name = filename[:-len(ext)]
+    else:
+        name, ext = os.path.splitext(filename)
     name = re.sub(r'[^\w\s-]', '', name)
     name = re.sub(r'[-\s]+', '-', name).strip().lower()
     name = name[:100]
@@ -173,14 +210,16 @@ def get_uploaded_files():
     
     files = []
     for filename in os.listdir(upload_dir):
-        if filename.endswith(('.json', '.xml')):
+        extension = get_file_extension(filename)
+        if extension:
             file_path = os.path.join(upload_dir, filename)
             try:
                 files.append({
                     'name': filename,
                     'path': file_path,
                     'size': os.path.getsize(file_path),
-                    'type': 'JSON' if filename.endswith('.json') else 'XML',
+                    'type': FILE_EXTENSIONS[extension],
+                    'compressed': is_compressed(filename),
                     'modified': os.path.getmtime(file_path)
                 })
             except OSError:
@@ -189,9 +228,91 @@ def get_uploaded_files():
     files.sort(key=lambda x: x['modified'], reverse=True)
     return files
 
-def save_health_data_from_dict(data):
+def read_uploaded_file(file_info):
+    """
+    Прочитать и разобрать один загруженный файл для просмотра
+    """
+    try:
+        if file_info['type'] == 'JSON':
+            content = import_from_json(file_info['path'])
+        else:
+            content = import_from_xml(file_info['path'])
+        
+        return {
+            'file_info': file_info,
+            'content': content
+        }
+    except Exception as e:
+        return {
+            'file_info': file_info,
+            'error': str(e)
+        }
+
+_file_read_executor = None
+
+def get_file_read_executor():
+    """
+    Общий ограниченный пул потоков для чтения файлов
+    """
+    global _file_read_executor
+    if _file_read_executor is None:
+        _file_read_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'FILE_READ_WORKERS', 8),
+            thread_name_prefix='health-file-read'
+        )
+    return _file_read_executor
+
+async def read_uploaded_files(files):
+    """
+    Параллельно прочитать загруженные файлы в пуле потоков,
+    сохраняя исходный порядок
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_file_read_executor()
+    return await asyncio.gather(*(
+        loop.run_in_executor(executor, read_uploaded_file, file_info)
+        for file_info in files
+    ))
+
+def get_db_state():
+    """
+    Состояние таблицы для условных запросов: количество записей и
+    время последнего изменения. Удаление тоже считается изменением
+    (по отметкам об удалении), иначе после удаления самой свежей записи
+    Max('updated_at') уменьшился бы и клиент с If-Modified-Since получил
+    бы 304 для устаревшего списка.
+    """
+    state = HealthData.objects.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_deleted = HealthDataTombstone.objects.aggregate(last=Max('deleted_at'))['last']
+    changes = [value for value in (state['last_modified'], last_deleted) if value is not None]
+    return state['count'], max(changes, default=None)
+
+def get_upload_directory_state():
+    """
+    Состояние директории загрузок без чтения содержимого файлов:
+    отпечаток списка файлов (имя, размер, mtime) и время последнего изменения
+    """
+    upload_dir = get_upload_directory()
+    latest = os.path.getmtime(upload_dir)
+    digest = hashlib.md5()
+    
+    with os.scandir(upload_dir) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if not get_file_extension(entry.name):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns};".encode('utf-8'))
+            latest = max(latest, stat.st_mtime)
+    
+    return digest.hexdigest(), datetime.fromtimestamp(latest, tz=timezone.utc)
+
+def save_health_data_from_dict(data, import_batch=''):
     """
-    Сохранение данных в базу с проверкой на дубликаты
+    Сохранение данных в базу с проверкой на дубликаты.
+    import_batch позволяет потом удалить все записи одной загрузки.
     """
     if HealthData.objects.filter(patient_id=data['patient_id']).exists():
         raise ValidationError(f"Пациент с ID {data['patient_id']} уже существует в базе данных")
@@ -205,7 +326,8 @@ def save_health_data_from_dict(data):
         blood_pressure_systolic=data['blood_pressure_systolic'],
         blood_pressure_diastolic=data['blood_pressure_diastolic'],
         heart_rate=data['heart_rate'],
-        cholesterol=data['cholesterol']
+        cholesterol=data['cholesterol'],
+        import_batch=import_batch
     )
     
     health_data.full_clean()
@@ -1,25 +1,107 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404, FileResponse, QueryDict
 from django.contrib import messages
-from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
 from django.db.models import Q
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, urlencode
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+import hashlib
 import os
 import uuid
 
-from .forms import HealthDataForm, FileUploadForm, SaveLocationForm, DataSourceForm
-from .models import HealthData
+from .forms import (
+    HealthDataForm, FileUploadForm, SaveLocationForm, DataSourceForm, CohortFilterForm,
+    BulkActionForm, get_import_batch_choices
+)
+from .models import DuplicateCandidate, HealthData
+from .bulk import PartialBulkOperation, bulk_delete, bulk_update, get_transaction_limit
+from .duplicates import get_pending_candidates, register_candidates
+from .decorators import async_condition
+from .caching import get_or_compute, invalidate_data_cache, render_patient_rows
+from .analytics import DEFAULT_TOP_N, MAX_TOP_N, get_analysis_series, get_summary
+from .sketches import get_percentile_table
 from .utils import (
     export_to_json, export_to_xml, import_from_json, import_from_xml,
     get_upload_directory, sanitize_filename, get_uploaded_files,
-    save_health_data_from_dict
+    save_health_data_from_dict, get_db_state, get_upload_directory_state,
+    read_uploaded_files, get_file_extension, is_compressed, open_data_file,
+    write_data_file, accepts_gzip, FILE_EXTENSIONS
 )
 
+RECORDS_PER_PAGE = 50
+
+EXPORT_CONTENT_TYPES = {
+    'json': 'application/json',
+    'xml': 'application/xml',
+}
+
+def _validators(request, compute):
+    """
+    Вычислить пару (etag, last_modified) один раз за запрос: декоратор
+    condition вызывает функции ETag и Last-Modified по отдельности.
+    Страницы с ожидающими flash-сообщениями не кешируются клиентом.
+    """
+    if not hasattr(request, '_health_validators'):
+        if len(messages.get_messages(request)):
+            request._health_validators = (None, None)
+        else:
+            fingerprint, last_modified = compute()
+            etag = None
+            if fingerprint is not None:
+                etag = hashlib.md5(
+                    f"{fingerprint}|{request.GET.urlencode()}".encode('utf-8')
+                ).hexdigest()
+            request._health_validators = (etag, last_modified)
+    return request._health_validators
+
+def _db_fingerprint():
+    count, last_modified = get_db_state()
+    if not count:
+        return None, None
+    return f"db:{count}:{last_modified.isoformat()}", last_modified
+
+def _data_list_fingerprint(request):
+    if request.GET.get('source') == 'file':
+        digest, last_modified = get_upload_directory_state()
+        return f"file:{digest}", last_modified
+    count, last_modified = get_db_state()
+    return f"db:{count}:{last_modified.isoformat() if last_modified else ''}", last_modified
+
+def _data_list_etag(request):
+    return _validators(request, lambda: _data_list_fingerprint(request))[0]
+
+def _data_list_last_modified(request):
+    return _validators(request, lambda: _data_list_fingerprint(request))[1]
+
+def _analyze_etag(request):
+    return _validators(request, _db_fingerprint)[0]
+
+def _analyze_last_modified(request):
+    return _validators(request, _db_fingerprint)[1]
+
+def _record_fingerprint(record_id, file_format):
+    updated_at = HealthData.objects.filter(id=record_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    return f"record:{record_id}:{file_format}:{updated_at.isoformat()}", updated_at
+
+def _record_etag(request, record_id, file_format):
+    return _validators(request, lambda: _record_fingerprint(record_id, file_format))[0]
+
+def _record_last_modified(request, record_id, file_format):
+    return _validators(request, lambda: _record_fingerprint(record_id, file_format))[1]
+
 def home(request):
     """Главная страница"""
-    context = {
+    context = get_or_compute('home', lambda: {
         'total_patients': HealthData.objects.count(),
         'total_files': len(get_uploaded_files())
-    }
+    })
     return render(request, 'health_info/home.html', context)
 
 def input_data(request):
@@ -47,6 +129,7 @@ def input_data(request):
                             request, 
                             f'Данные пациента {health_data.patient_name} успешно сохранены в базу данных!'
                         )
+                        _warn_duplicates(request, health_data)
                 
                 else:  # Сохраняем в файл
                     health_data = form.save(commit=False)
@@ -59,14 +142,13 @@ def input_data(request):
                     
                     safe_filename = sanitize_filename(filename)
                     file_path = os.path.join(upload_dir, safe_filename)
-                    
-                    with open(file_path, 'w', encoding='utf-8') as file:
-                        file.write(content)
+                    write_data_file(file_path, [content.encode('utf-8')])
                     
                     messages.success(
                         request, 
                         f'Данные пациента {health_data.patient_name} успешно сохранены в файл!'
                     )
+                    _warn_duplicates(request, health_data)
                 
                 return redirect('health_info:data_list')
                 
@@ -83,6 +165,16 @@ def input_data(request):
         'save_form': save_form
     })
 
+def _warn_duplicates(request, record):
+    """Предупредить о похожих пациентах под другими ID"""
+    candidates = register_candidates(record)
+    if candidates:
+        names = ', '.join(f'{other.patient_name} ({other.patient_id})' for other, _ in candidates[:3])
+        messages.warning(
+            request,
+            f'Возможные дубликаты пациента {record.patient_name}: {names}. Проверьте их на странице дубликатов.'
+        )
+
 def upload_file(request):
     """Загрузка файла на сервер"""
     if request.method == 'POST':
@@ -91,12 +183,12 @@ def upload_file(request):
             uploaded_file = request.FILES['file']
             file_type = form.cleaned_data['file_type']
             
-            # Проверяем расширение файла
-            file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+            # Проверяем расширение файла (допускается сжатие gzip)
+            file_extension = get_file_extension(uploaded_file.name)
             expected_ext = f'.{file_type}'
             
-            if file_extension != expected_ext:
-                messages.error(request, f'Файл должен иметь расширение {expected_ext}')
+            if file_extension not in (expected_ext, f'{expected_ext}.gz'):
+                messages.error(request, f'Файл должен иметь расширение {expected_ext} или {expected_ext}.gz')
                 return render(request, 'health_info/upload_file.html', {'form': form})
             
             safe_filename = sanitize_filename(uploaded_file.name)
@@ -104,9 +196,8 @@ def upload_file(request):
             file_path = os.path.join(upload_dir, safe_filename)
             
             try:
-                with open(file_path, 'wb+') as destination:
-                    for chunk in uploaded_file.chunks():
-                        destination.write(chunk)
+                file_path = write_data_file(file_path, uploaded_file.chunks())
+                invalidate_data_cache()
                 
                 # Валидация и импорт данных
                 if file_type == 'json':
@@ -116,11 +207,13 @@ def upload_file(request):
                 
                 # Сохраняем в базу данных с проверкой дубликатов
                 try:
-                    health_data = save_health_data_from_dict(data)
+                    health_data = save_health_data_from_dict(data, import_batch=uuid.uuid4().hex)
                     messages.success(
                         request, 
-                        f'Файл успешно загружен! Данные пациента {health_data.patient_name} импортированы в базу данных.'
+                        f'Файл успешно загружен! Данные пациента {health_data.patient_name} импортированы в базу данных '
+                        f'(пакет импорта {health_data.import_batch[:8]}).'
                     )
+                    _warn_duplicates(request, health_data)
                 except Exception as e:
                     messages.warning(request, f'Файл загружен, но данные не импортированы: {str(e)}')
                 
@@ -135,7 +228,8 @@ def upload_file(request):
     
     return render(request, 'health_info/upload_file.html', {'form': form})
 
-def data_list(request):
+@async_condition(etag_func=_data_list_etag, last_modified_func=_data_list_last_modified)
+async def data_list(request):
     """Список данных с выбором источника"""
     source_form = DataSourceForm(request.GET or None)
     
@@ -144,92 +238,99 @@ def data_list(request):
     else:
         source = 'db'
     
+    files = await sync_to_async(get_uploaded_files, thread_sensitive=False)()
+    
     context = {
         'source_form': source_form,
         'source': source,
-        'files_exist': len(get_uploaded_files()) > 0,
-        'db_records_exist': HealthData.objects.exists()
+        'files_exist': len(files) > 0,
+        'db_records_exist': await HealthData.objects.aexists()
     }
     
     if source == 'file':
-        files = get_uploaded_files()
-        file_contents = []
-        
-        for file_info in files:
-            try:
-                if file_info['type'] == 'JSON':
-                    content = import_from_json(file_info['path'])
-                else:
-                    content = import_from_xml(file_info['path'])
-                
-                file_contents.append({
-                    'file_info': file_info,
-                    'content': content
-                })
-            except Exception as e:
-                file_contents.append({
-                    'file_info': file_info,
-                    'error': str(e)
-                })
-        
         context.update({
-            'file_contents': file_contents,
+            'file_contents': await read_uploaded_files(files),
             'total_files': len(files)
         })
         
-        return render(request, 'health_info/file_list.html', context)
+        return await sync_to_async(render)(request, 'health_info/file_list.html', context)
     
     else:  # source == 'db'
-        search_query = request.GET.get('q', '')
-        records = HealthData.objects.all().order_by('-created_at')
-        
-        if search_query:
-            records = records.filter(
-                Q(patient_id__icontains=search_query) |
-                Q(patient_name__icontains=search_query)
-            )
-        
-        context.update({
-            'records': records,
-            'search_query': search_query,
-            'total_records': records.count()
-        })
-        
-        return render(request, 'health_info/db_list.html', context)
+        context.update(await sync_to_async(_db_list_context)(request))
+        status = 400 if context['cohort_form'].errors else 200
+        return await sync_to_async(render)(request, 'health_info/db_list.html', context, status=status)
+
+def _filter_records(params):
+    """Записи из БД с учётом поиска и фильтра когорты из параметров запроса"""
+    search_query = params.get('q', '')
+    cohort_form = CohortFilterForm(params)
+    records = cohort_form.filter_queryset(HealthData.objects.all()).order_by('-created_at')
+    
+    if search_query:
+        records = records.filter(
+            Q(patient_id__icontains=search_query) |
+            Q(patient_name__icontains=search_query)
+        )
+    return records, cohort_form, search_query
+
+def _db_list_context(request, use_cache=True):
+    """
+    Поиск, фильтр когорты и постраничный вывод записей из БД.
+    use_cache=False отключает кеш фрагментов строк (для замеров).
+    """
+    records, cohort_form, search_query = _filter_records(request.GET)
+    if not cohort_form.is_valid():
+        # Как и на странице анализа: вместо всех записей — ошибки фильтра
+        return {'cohort_form': cohort_form, 'search_query': search_query}
+    
+    page_obj = Paginator(records, RECORDS_PER_PAGE).get_page(request.GET.get('page'))
+    
+    return {
+        'rows': render_patient_rows(page_obj.object_list, use_cache=use_cache),
+        'page_obj': page_obj,
+        'cohort_form': cohort_form,
+        'bulk_form': BulkActionForm(),
+        'search_query': search_query,
+        'total_records': page_obj.paginator.count
+    }
 
-def ajax_search(request):
+async def ajax_search(request):
     """AJAX поиск по базе данных"""
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         query = request.GET.get('q', '')
         
         if query:
-            results = HealthData.objects.filter(
-                Q(patient_id__icontains=query) |
-                Q(patient_name__icontains=query)
-            ).order_by('-created_at')[:10]
-            
-            data = []
-            for record in results:
-                data.append({
-                    'id': record.id,
-                    'patient_id': record.patient_id,
-                    'patient_name': record.patient_name,
-                    'age': record.age,
-                    'height': record.height,
-                    'weight': record.weight,
-                    'bmi': record.bmi,
-                    'blood_pressure': f"{record.blood_pressure_systolic}/{record.blood_pressure_diastolic}",
-                    'heart_rate': record.heart_rate,
-                    'cholesterol': record.cholesterol,
-                    'created_at': record.created_at.strftime('%d.%m.%Y %H:%M'),
-                    'edit_url': f"/edit/{record.id}/",
-                    'delete_url': f"/delete/{record.id}/"
-                })
-            
+            data = await sync_to_async(get_or_compute)('ajax_search', lambda: _search_results(query), query)
             return JsonResponse({'results': data})
     
     return JsonResponse({'results': []})
 
+def _search_results(query):
+    """Результаты AJAX поиска в виде списка словарей"""
+    results = HealthData.objects.filter(
+        Q(patient_id__icontains=query) |
+        Q(patient_name__icontains=query)
+    ).order_by('-created_at')[:10]
+    
+    data = []
+    for record in results:
+        data.append({
+            'id': record.id,
+            'patient_id': record.patient_id,
+            'patient_name': record.patient_name,
+            'age': record.age,
+            'height': record.height,
+            'weight': record.weight,
+            'bmi': record.bmi,
+            'blood_pressure': f"{record.blood_pressure_systolic}/{record.blood_pressure_diastolic}",
+            'heart_rate': record.heart_rate,
+            'cholesterol': record.cholesterol,
+            'created_at': record.created_at.strftime('%d.%m.%Y %H:%M'),
+            'edit_url': f"/edit/{record.id}/",
+            'delete_url': f"/delete/{record.id}/"
+        })
+    return data
+
 def edit_record(request, record_id):
     """Редактирование записи в базе данных"""
     record = get_object_or_404(HealthData, id=record_id)
@@ -268,44 +369,183 @@ def delete_record(request, record_id):
         'record': record
     })
 
+def bulk_action(request):
+    """Массовое изменение или удаление записей одним запросом к БД на порцию"""
+    query = request.POST.get('query', '')
+    redirect_url = reverse('health_info:data_list') + (f'?{query}' if query else '')
+    if request.method != 'POST':
+        return redirect(redirect_url)
+    
+    form = BulkActionForm(request.POST)
+    if not form.is_valid():
+        errors = form.non_field_errors() or ['Некорректные параметры массовой операции']
+        messages.error(request, ' '.join(errors))
+        return redirect(redirect_url)
+    
+    scope = form.cleaned_data['scope']
+    if scope == 'selected':
+        records = HealthData.objects.filter(pk__in=form.cleaned_data['ids'])
+    elif scope == 'import_batch':
+        records = HealthData.objects.filter(import_batch=form.cleaned_data['import_batch'])
+    else:
+        records, cohort_form, _ = _filter_records(QueryDict(query))
+        if not cohort_form.is_valid():
+            messages.error(request, 'Фильтр когорты содержит ошибки. Записи не изменены.')
+            return redirect(redirect_url)
+    
+    try:
+        if form.cleaned_data['action'] == 'delete':
+            count = bulk_delete(records)
+            messages.success(request, f'Удалено записей: {count}')
+        else:
+            count = bulk_update(records, form.cleaned_data['values'])
+            messages.success(request, f'Изменено записей: {count}')
+        if count > get_transaction_limit():
+            messages.info(
+                request,
+                f'Выборка больше {get_transaction_limit()} записей обработана несколькими транзакциями.'
+            )
+    except ValidationError as e:
+        messages.error(request, ' '.join(e.messages))
+    except PartialBulkOperation as e:
+        messages.error(request, str(e))
+    
+    return redirect(redirect_url)
+
+def import_batch_choices(request):
+    """Варианты пакетов импорта для формы массовых операций (JSON)"""
+    choices = get_or_compute('import_batches', get_import_batch_choices)
+    return JsonResponse({'choices': [{'value': value, 'label': label} for value, label in choices]})
+
+@gzip_page
+@condition(etag_func=_record_etag, last_modified_func=_record_last_modified)
+def export_record(request, record_id, file_format):
+    """Экспорт одной записи в JSON или XML файл"""
+    if file_format not in EXPORT_CONTENT_TYPES:
+        raise Http404('Неподдерживаемый формат экспорта')
+    
+    record = get_object_or_404(HealthData, id=record_id)
+    
+    if file_format == 'json':
+        content = export_to_json(record)
+    else:
+        content = export_to_xml(record)
+    
+    response = HttpResponse(content, content_type=f'{EXPORT_CONTENT_TYPES[file_format]}; charset=utf-8')
+    response['Content-Disposition'] = content_disposition_header(
+        True, f'health_data_{record.patient_id}.{file_format}'
+    )
+    return response
+
+@gzip_page
+def download_file(request, filename):
+    """
+    Скачивание загруженного файла. Файлы, хранящиеся сжатыми, отдаются
+    клиенту, принимающему gzip, без распаковки; остальным — распакованными
+    на лету. Несжатые файлы сжимаются при передаче (gzip_page).
+    """
+    safe_name = os.path.basename(filename)
+    file_path = os.path.join(get_upload_directory(), safe_name)
+    
+    if safe_name != filename or not get_file_extension(safe_name) or not os.path.isfile(file_path):
+        raise Http404('Файл не найден')
+    
+    if not is_compressed(safe_name):
+        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=safe_name)
+    
+    original_name = safe_name[:-len('.gz')]
+    file_type = FILE_EXTENSIONS[get_file_extension(safe_name)].lower()
+    content_type = f'{EXPORT_CONTENT_TYPES.get(file_type, "application/octet-stream")}; charset=utf-8'
+    if accepts_gzip(request):
+        response = FileResponse(
+            open(file_path, 'rb'), as_attachment=True, filename=original_name, content_type=content_type
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = FileResponse(
+            open_data_file(file_path), as_attachment=True, filename=original_name, content_type=content_type
+        )
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+def duplicate_list(request):
+    """Пары записей, предположительно относящихся к одному пациенту"""
+    page_obj = Paginator(get_pending_candidates(), RECORDS_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'health_info/duplicates.html', {
+        'page_obj': page_obj,
+        'total_candidates': page_obj.paginator.count,
+    })
+
+def resolve_duplicate(request, candidate_id):
+    """Решение по паре: не дубликат или удалить одну из записей"""
+    candidate = get_object_or_404(
+        DuplicateCandidate.objects.select_related('record', 'duplicate'), id=candidate_id
+    )
+    if request.method == 'POST':
+        decision = request.POST.get('decision')
+        if decision == 'dismiss':
+            candidate.status = DuplicateCandidate.STATUS_DISMISSED
+            candidate.save(update_fields=['status'])
+            messages.success(request, 'Пара отмечена как разные пациенты.')
+        elif decision in ('delete_record', 'delete_duplicate'):
+            record = candidate.record if decision == 'delete_record' else candidate.duplicate
+            patient_name = record.patient_name
+            # Вместе с записью каскадно удаляется и эта пара
+            record.delete()
+            messages.success(request, f'Запись пациента {patient_name} удалена как дубликат.')
+        else:
+            messages.error(request, 'Неизвестное действие.')
+    page = urlencode({'page': request.POST.get('page', 1)})
+    return redirect(f"{reverse('health_info:duplicate_list')}?{page}")
+
+@condition(etag_func=_analyze_etag, last_modified_func=_analyze_last_modified)
 def analyze_data(request):
     """
-    Анализ медицинских данных
+    Анализ медицинских данных. Страница получает только сводку; графики
+    и топ-таблицы загружаются из analyze_series
     """
-    from django.shortcuts import render
-    from .models import HealthData
-    
-    all_data = HealthData.objects.all()
-    
-    if not all_data.exists():
-        from django.contrib import messages
-        messages.info(request, 'Нет данных для анализа. Добавьте данные через форму или загрузите файлы.')
-        from django.shortcuts import redirect
-        return redirect('health_info:home')
-    
-    # Базовая статистика
-    total_patients = all_data.count()
-    avg_age = sum([data.age for data in all_data]) / total_patients
-    avg_bmi = sum([data.bmi for data in all_data]) / total_patients
-    avg_heart_rate = sum([data.heart_rate for data in all_data]) / total_patients
-    avg_cholesterol = sum([data.cholesterol for data in all_data]) / total_patients
-    
-    # Категории ИМТ
-    bmi_categories = {
-        'underweight': all_data.filter(bmi__lt=18.5).count(),
-        'normal': all_data.filter(bmi__gte=18.5, bmi__lt=25).count(),
-        'overweight': all_data.filter(bmi__gte=25, bmi__lt=30).count(),
-        'obese': all_data.filter(bmi__gte=30).count()
-    }
+    cohort_form = CohortFilterForm(request.GET)
+    if not cohort_form.is_valid():
+        # Как и analyze_series: некорректный фильтр не подменяется всей
+        # популяцией, на странице выводятся только ошибки формы
+        return render(request, 'health_info/analyze.html', {'cohort_form': cohort_form}, status=400)
     
-    context = {
-        'total_patients': total_patients,
-        'avg_age': round(avg_age, 1),
-        'avg_bmi': round(avg_bmi, 1),
-        'avg_heart_rate': round(avg_heart_rate, 1),
-        'avg_cholesterol': round(avg_cholesterol, 1),
-        'bmi_categories': bmi_categories,
-        'all_data': all_data
-    }
+    lookups = cohort_form.get_lookups()
+    analysis = get_or_compute('analyze', lambda: get_summary(lookups), sorted(lookups.items()))
+    
+    if analysis is None:
+        if not cohort_form.is_active:
+            messages.info(request, 'Нет данных для анализа. Добавьте данные через форму или загрузите файлы.')
+            return redirect('health_info:home')
+        analysis = {'total_patients': 0, 'bmi_categories': {}}
+    
+    context = dict(analysis)
+    context['cohort_form'] = cohort_form
+    if not cohort_form.is_active:
+        context['percentiles'] = get_percentile_table()
+    
+    return render(request, 'health_info/analyze.html', context)
+
+@gzip_page
+@condition(etag_func=_analyze_etag, last_modified_func=_analyze_last_modified)
+def analyze_series(request):
+    """
+    Агрегированные ряды для графиков страницы анализа (JSON): гистограммы
+    показателей и топ-N пациентов. Размер ответа ограничен и не зависит
+    от числа пациентов (?top= не больше MAX_TOP_N)
+    """
+    cohort_form = CohortFilterForm(request.GET)
+    if not cohort_form.is_valid():
+        return JsonResponse({'errors': cohort_form.errors}, status=400)
+    
+    try:
+        top = int(request.GET.get('top', DEFAULT_TOP_N))
+    except ValueError:
+        return JsonResponse({'errors': {'top': ['Должно быть целым числом']}}, status=400)
+    top = min(max(top, 1), MAX_TOP_N)
     
-    return render(request, 'health_info/analyze.html', context)
\ No newline at end of file
+    lookups = cohort_form.get_lookups()
+    series = get_or_compute(
+        'analyze_series', lambda: get_analysis_series(lookups, top), sorted(lookups.items()), top
+    )
+    return JsonResponse(series)
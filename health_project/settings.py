@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'health_info',
 ]
 
@@ -52,6 +53,35 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'health_project.wsgi.application'
+ASGI_APPLICATION = 'health_project.asgi.application'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'health_info.api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # API отдаёт медицинские данные только аутентифицированным клиентам:
+    # по JWT (api/v1/token/) или по сессии Django для просмотра в браузере
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+}
+
+# Количество потоков для параллельного чтения загруженных файлов
+FILE_READ_WORKERS = 8
+
+# Хранить загруженные и сохранённые файлы данных сжатыми gzip (.json.gz,
+# .xml.gz). Чтение прозрачно для обоих форматов, поэтому режим можно
+# включить на существующем хранилище (manage.py compress_uploads)
+HEALTH_DATA_COMPRESS_AT_REST = False
+
+# Массовые операции над выборкой до этого размера выполняются в одной
+# транзакции (всё или ничего); большие выборки делятся на транзакции
+HEALTH_DATA_BULK_TRANSACTION_LIMIT = 50000
 
 # SQLite Database
 DATABASES = {
@@ -61,6 +91,19 @@ DATABASES = {
     }
 }
 
+# Общий для всех воркеров кеш в локальном SQLite-файле
+CACHES = {
+    'default': {
+        'BACKEND': 'health_info.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 4,
+        },
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/v1/', include('health_info.api.urls')),
     path('', include('health_info.urls')),
 ]
 